@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""This module provides the EdgeStore class."""
+
+from array import array
+
+_INDEX_TYPE = 'I' if array('I').itemsize >= 4 else 'L'
+
+class EdgeStore:
+    """The edges of a graph, given by pairs of vertex indices
+
+    Edges are undirected and stored with the smaller index first, in the
+    order they were added.  Endpoints live in packed arrays, found by a
+    hash index on the 64 bit key (min<<32)|max.  Edge weights w and wa are
+    kept only for the edges that have any.
+
+    Reading, the store behaves like a dict mapping (idx0, idx1) tuples to
+    {'w': ..., 'wa': ...} dicts, with None for unset weights.  These dicts
+    are made up on the fly, so weights are changed with set_weight() or by
+    assigning a whole dict.
+
+    Vertex indices must be smaller than 2**32, and edges cannot be removed.
+    """
+    def __init__(self):
+        self._src = array(_INDEX_TYPE)
+        self._dst = array(_INDEX_TYPE)
+        self._index = {}
+        self._weights = {}
+
+    @staticmethod
+    def _key(idx0, idx1):
+        if idx0 > idx1:
+            idx0, idx1 = idx1, idx0
+        if idx0 < 0 or idx1 >> 32:
+            raise ValueError("Vertex index %d out of range."%(idx0 if idx0 < 0 else idx1,))
+        return (idx0 << 32) | idx1
+
+    def add(self, idx0, idx1, w=None, wa=None):
+        """Add the edge between idx0 and idx1 if it does not exist yet.
+
+        Returns whether the edge was added; an existing edge is left alone."""
+        key = self._key(idx0, idx1)
+        if key in self._index:
+            return False
+        pos = len(self._src)
+        self._index[key] = pos
+        self._src.append(key >> 32)
+        self._dst.append(key & 0xffffffff)
+        if w is not None or wa is not None:
+            self._weights[pos] = (w, wa)
+        return True
+
+    def _position(self, edge):
+        try:
+            return self._index[self._key(*edge)]
+        except ValueError:
+            raise KeyError(edge)
+
+    def _set_weight(self, pos, name, value):
+        w, wa = self._weights.get(pos, (None, None))
+        if name == 'w':
+            w = value
+        elif name == 'wa':
+            wa = value
+        else:
+            raise KeyError(name)
+        if w is not None or wa is not None:
+            self._weights[pos] = (w, wa)
+        else:
+            self._weights.pop(pos, None)
+
+    def set_weight(self, edge, name, value):
+        """Set weight name ('w' or 'wa') of an existing edge to value (None to unset)."""
+        self._set_weight(self._position(edge), name, value)
+
+    def set_weights(self, name, values):
+        """Set weight name ('w' or 'wa') of all edges, in order, to values (None to unset).
+
+        The whole column is replaced at once; edges past the end of values
+        keep their weight."""
+        if name not in ('w', 'wa'):
+            raise KeyError(name)
+        values = list(values)[:len(self._src)]
+        weights = self._weights
+        keep = 1 if name == 'w' else 0
+        other = [None] * len(values)
+        for pos, pair in weights.items():
+            if pos < len(values):
+                other[pos] = pair[keep]
+        weights.update(enumerate(zip(values, other) if name == 'w' else zip(other, values)))
+        if None in values:
+            for pos, pair in enumerate(zip(values, other)):
+                if pair == (None, None):
+                    del weights[pos]
+
+    def __setitem__(self, edge, attributes):
+        w, wa = attributes['w'], attributes['wa']
+        if not self.add(*edge, w, wa):
+            pos = self._position(edge)
+            if w is not None or wa is not None:
+                self._weights[pos] = (w, wa)
+            else:
+                self._weights.pop(pos, None)
+
+    def __getitem__(self, edge):
+        w, wa = self._weights.get(self._position(edge), (None, None))
+        return {'w': w, 'wa': wa}
+
+    def __contains__(self, edge):
+        try:
+            return self._key(*edge) in self._index
+        except ValueError:
+            return False
+
+    def __len__(self):
+        return len(self._src)
+
+    def __iter__(self):
+        return zip(self._src, self._dst)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        weights = self._weights
+        for pos, edge in enumerate(zip(self._src, self._dst)):
+            w, wa = weights.get(pos, (None, None))
+            yield edge, {'w': w, 'wa': wa}
+
+    def weighted(self):
+        """Iterate over (idx0, idx1, w, wa) of all edges, without making up dicts."""
+        weights = self._weights
+        for pos, (idx0, idx1) in enumerate(zip(self._src, self._dst)):
+            w, wa = weights.get(pos, (None, None))
+            yield idx0, idx1, w, wa
+
+    def arrays(self):
+        """Return the packed arrays of smaller and larger endpoints."""
+        return self._src, self._dst
+
+    def __repr__(self):
+        return "%s(%s)"%(self.__class__.__name__, dict(self.items()))
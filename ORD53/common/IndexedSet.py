@@ -22,7 +22,10 @@
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
 
-"""This module provides the IndexedSet class."""
+"""This module provides the IndexedSet and SnappingIndexedSet classes."""
+
+import itertools
+import math
 
 class IndexedSet:
     """A set of elements backed by a list
@@ -52,3 +55,67 @@ class IndexedSet:
 
     def __len__(self):
         return len(self.list)
+
+class SnappingIndexedSet(IndexedSet):
+    """An IndexedSet of vertices that also merges vertices closer than eps.
+
+    A vertex within distance eps of one already in the set is not added;
+    add() returns the index of the earliest such vertex instead.  Candidates are
+    looked up in a uniform grid of cell size eps, so add() takes expected
+    constant time.  merged counts the vertices merged that way (exact
+    duplicates are not counted)."""
+    def __init__(self, eps):
+        if not eps > 0:
+            raise ValueError("Snapping distance must be positive.")
+        super().__init__()
+        self.eps = eps
+        self.merged = 0
+        self.grid = {}
+        self.coordinates = []
+        self._neighbourhoods = {}
+
+    @staticmethod
+    def _coordinates(item):
+        if hasattr(item, 'z'):
+            return (float(item.x), float(item.y), float(item.z))
+        return (float(item.x), float(item.y))
+
+    def _neighbourhood(self, dim):
+        """Offsets of a grid cell and the cells around it."""
+        if dim not in self._neighbourhoods:
+            self._neighbourhoods[dim] = list(itertools.product((-1, 0, 1), repeat=dim))
+        return self._neighbourhoods[dim]
+
+    def _find_close(self, c, cell):
+        """Return the index of the earliest vertex within eps of coordinates c, or None."""
+        eps2 = self.eps * self.eps
+        found = None
+        for offset in self._neighbourhood(len(c)):
+            candidates = self.grid.get(tuple(k + o for k, o in zip(cell, offset)))
+            if candidates is None:
+                continue
+            for idx in candidates:
+                if (found is None or idx < found) and sum((a - b)*(a - b) for a, b in zip(c, self.coordinates[idx])) <= eps2:
+                    found = idx
+        return found
+
+    def add(self, item):
+        """Adds item to the set if neither it nor a vertex close to it exist yet.  Returns the index of the vertex that represents item."""
+        try:
+            return self.key_to_idx[item]
+        except KeyError:
+            pass
+        c = self._coordinates(item)
+        try:
+            cell = tuple(math.floor(x / self.eps) for x in c)
+        except (OverflowError, ValueError):
+            cell = None # infinite or NaN; only ever an exact match
+        if cell is not None:
+            idx = self._find_close(c, cell)
+            if idx is not None:
+                self.key_to_idx[item] = idx
+                self.merged += 1
+                return idx
+            self.grid.setdefault(cell, []).append(len(self.list))
+        self.coordinates.append(c)
+        return super().add(item)
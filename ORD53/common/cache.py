@@ -0,0 +1,186 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""An on-disk cache of conversion results."""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from ORD53.common.output import write_files
+
+CACHE_VERSION = 5 # bump whenever the output for the same input and options changes
+STALE_AGE = 24 * 3600 # seconds after which directories left over by a crashed store or eviction are removed
+
+class ConversionCache:
+    """A directory of conversion results, bounded in size.
+
+    Each entry is a directory named after its key and holds the output of
+    one conversion as numbered files, one per graph.  Entries are set up
+    under a temporary name and renamed into place, so that several processes
+    can share a cache.  When the cache grows beyond max_size bytes, the
+    least recently used entries are removed.  Outputs are handed out as
+    open files, so they can be read to the end even if their entry is
+    removed in the meantime.
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(content, **params):
+        """Return the key for converting content (str, bytes or mmap) with the given parameters.
+
+        The parameters need to be JSON serializable and should include
+        everything the output depends on.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps([CACHE_VERSION, params], sort_keys=True).encode())
+        h.update(b'\0')
+        h.update(content.encode() if isinstance(content, str) else content)
+        return h.hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.directory, key)
+
+    @staticmethod
+    def _open_outputs(entry):
+        """Open the output files in the directory entry for reading, in order."""
+        files = []
+        try:
+            for fn in sorted(os.listdir(entry)):
+                files.append(open(os.path.join(entry, fn), 'rb'))
+        except BaseException:
+            for f in files:
+                f.close()
+            raise
+        return files
+
+    def get(self, key):
+        """Return the output files stored for key, in order and opened for reading, or None.
+
+        All files are open before any is returned, so reading them is not
+        affected by the entry being evicted.  The caller closes them."""
+        entry = self._entry(key)
+        try:
+            os.utime(entry)
+            return self._open_outputs(entry)
+        except FileNotFoundError:
+            return None
+
+    def put(self, key, writers, jobs=1):
+        """Store an entry for key and return its output files, opened for reading as by get().
+
+        writers are callables, one per output file, that write the output
+        to the binary file object they are given.  With jobs > 1, several
+        are run at once, see write_files().  Storing a new entry may evict
+        old ones.  Should a writer fail, nothing is left behind.
+        """
+        stage = tempfile.mkdtemp(prefix='.tmp-', dir=self.directory)
+        files = []
+        try:
+            writers = list(writers)
+            write_files(writers, [os.path.join(stage, "%03d"%(i,)) for i in range(len(writers))], jobs)
+            files = self._open_outputs(stage)
+            try:
+                os.rename(stage, self._entry(key))
+            except OSError:
+                # somebody else stored the same entry in the meantime
+                shutil.rmtree(stage)
+            self.evict(keep=key)
+        except BaseException:
+            for f in files:
+                f.close()
+            shutil.rmtree(stage, ignore_errors=True)
+            raise
+        return files
+
+    @staticmethod
+    def _tree_stats(path):
+        """Return the latest mtime and the total size of the directory path and everything below it."""
+        mtime, size = os.stat(path).st_mtime, 0
+        for dirpath, dirnames, filenames in os.walk(path):
+            for fn in filenames:
+                try:
+                    st = os.stat(os.path.join(dirpath, fn))
+                except FileNotFoundError:
+                    continue
+                mtime = max(mtime, st.st_mtime)
+                size += st.st_size
+        return mtime, size
+
+    def _sizes(self):
+        """Return (mtime, size, key) of all entries, and the total size of other directories.
+
+        The other directories hold entries being stored or removed.  Those
+        that have not changed for STALE_AGE seconds were left behind by
+        processes that died, and are removed."""
+        entries = []
+        pending = 0
+        now = time.time()
+        for e in os.scandir(self.directory):
+            if not e.is_dir(follow_symlinks=False):
+                continue
+            if e.name.startswith('.'):
+                try:
+                    mtime, size = self._tree_stats(e.path)
+                except FileNotFoundError:
+                    continue
+                if now - mtime > STALE_AGE:
+                    shutil.rmtree(e.path, ignore_errors=True)
+                else:
+                    pending += size
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(e.path))
+                entries.append((e.stat().st_mtime, size, e.name))
+            except FileNotFoundError:
+                pass
+        return entries, pending
+
+    def evict(self, keep=None):
+        """Remove least recently used entries, except keep, until the cache fits into max_size.
+
+        Entries being stored or removed by others count towards the size."""
+        entries, pending = self._sizes()
+        entries.sort()
+        total = sum(size for _, size, _ in entries) + pending
+        for _, size, key in entries:
+            if total <= self.max_size:
+                break
+            if key == keep:
+                continue
+            # move it out of the way first so nobody sees a partial entry
+            doomed = tempfile.mkdtemp(prefix='.del-', dir=self.directory)
+            try:
+                os.rename(self._entry(key), os.path.join(doomed, key))
+            except OSError:
+                pass
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
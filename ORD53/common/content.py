@@ -0,0 +1,94 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Access to input file contents without copying them around."""
+
+import io
+import mmap
+import os
+import stat
+
+def read_input(f):
+    """Return the contents of the binary file object f.
+
+    Regular files are memory mapped read-only, so their contents are neither
+    read nor copied up front.  Anything else, like pipes or stdin, is read
+    into a bytes object.
+    """
+    try:
+        fileno = f.fileno()
+        st = os.fstat(fileno)
+        if stat.S_ISREG(st.st_mode) and st.st_size > 0 and f.tell() == 0:
+            return mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    return f.read()
+
+def as_text(content):
+    """Return content (str, bytes or mmap) as str.
+
+    >>> as_text(b"1 2\\n")
+    '1 2\\n'
+    """
+    if isinstance(content, str):
+        return content
+    return bytes(content).decode()
+
+class BufferReader(io.RawIOBase):
+    """A read-only binary file object over a buffer such as bytes or an mmap.
+
+    Unlike io.BytesIO, it does not copy the buffer.
+
+    >>> with BufferReader(b"abcdef") as f:
+    ...     f.read(2), f.read()
+    (b'ab', b'cdef')
+    """
+    def __init__(self, buffer):
+        super().__init__()
+        self._view = memoryview(buffer)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos+n]
+        self._pos += n
+        return n
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+def as_file(content):
+    """Return a binary file object reading content (str, bytes or mmap).
+
+    Close it when done, so an underlying mmap can be closed as well.
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    return BufferReader(content)
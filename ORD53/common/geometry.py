@@ -23,11 +23,19 @@
 
 """2D and 3D geometric objects."""
 
+import math
+import numpy as np
+
 class Vertex2:
     """A 2D Vertex
 
     A vertex with 2 coordinates combined with a few operators to treat it like a vector.
+
+    Vertices are hashed and compared a lot when building graphs, so they
+    use slots rather than a __dict__ and are meant to be immutable.
     """
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -37,7 +45,7 @@ class Vertex2:
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.x == other.x and self.y == other.y
         else:
             return False
 
@@ -66,6 +74,8 @@ class Vertex3:
 
     A vertex with 3 coordinates combined with a few operators to treat it like a vector.
     """
+    __slots__ = ('x', 'y', 'z')
+
     def __init__(self, x, y, z):
         self.x = x
         self.y = y
@@ -76,7 +86,7 @@ class Vertex3:
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.x == other.x and self.y == other.y and self.z == other.z
         else:
             return False
 
@@ -98,3 +108,161 @@ class Vertex3:
     def lensquared(self):
         """Compute the squared length of this vector."""
         return self.dotproduct(self)
+
+
+class AffineTransform:
+    """An affine transformation of 2D or 3D coordinates
+
+    Transformations are built up step by step, each method returning a new
+    transformation that applies the step after the existing ones.  Steps
+    given in the plane, like rotated() and the Ipe style matrices of
+    transformed(), leave z alone.  Internally it is a homogeneous 4x4
+    matrix, so applying it is a single pass over the coordinates no matter
+    how many steps there are.
+    """
+    def __init__(self, matrix=None):
+        self.matrix = np.identity(4) if matrix is None else matrix
+
+    def __repr__(self):
+        return "%s(%s)"%(self.__class__.__name__, self.matrix.tolist())
+
+    def then(self, other):
+        """Return the transformation that applies self, then other."""
+        return AffineTransform(other.matrix @ self.matrix)
+
+    def scaled(self, factor):
+        """Scale uniformly by factor."""
+        return self.then(AffineTransform(np.diag([factor, factor, factor, 1.0])))
+
+    def translated(self, dx, dy, dz=0.0):
+        """Move by (dx, dy, dz)."""
+        m = np.identity(4)
+        m[:3, 3] = (dx, dy, dz)
+        return self.then(AffineTransform(m))
+
+    def rotated(self, degrees):
+        """Rotate counterclockwise around the origin."""
+        c, s = math.cos(math.radians(degrees)), math.sin(math.radians(degrees))
+        return self.transformed(c, s, -s, c, 0.0, 0.0)
+
+    def transformed(self, a, b, c, d, e, f):
+        """Apply the matrix (a, b, c, d, e, f) as used by Ipe.
+
+        It maps (x, y) to (a*x + c*y + e, b*x + d*y + f)."""
+        m = np.identity(4)
+        m[:2, :2] = ((a, c), (b, d))
+        m[:2, 3] = (e, f)
+        return self.then(AffineTransform(m))
+
+    def normalized(self, coordinates):
+        """Scale and move the image of coordinates into the unit box, keeping its aspect ratio."""
+        image = self.apply(coordinates)
+        if len(image) == 0:
+            return self
+        low = image.min(axis=0)
+        extent = (image.max(axis=0) - low).max()
+        moved = self.translated(*(-low))
+        return moved.scaled(1.0 / extent) if extent > 0 else moved
+
+    def apply(self, coordinates):
+        """Return the transformed (n, dim) array of coordinates."""
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        dim = coordinates.shape[1]
+        linear = self.matrix[:dim, :dim]
+        offset = self.matrix[:dim, 3]
+        diagonal = np.diagonal(linear)
+        if (linear == np.diag(diagonal)).all():
+            result = coordinates * diagonal
+        else:
+            # sum up column by column rather than using a matrix product, so
+            # the result is exactly what a*x + c*y + e gives for each point.
+            result = coordinates[:, :1] * linear[:, 0]
+            for j in range(1, dim):
+                result += coordinates[:, j:j+1] * linear[:, j]
+        if offset.any():
+            result += offset
+        return result
+
+
+def _arc_segments(sweep, radius, tolerance):
+    """How many segments it takes to approximate arcs of the given sweeps
+    (in radians) and radii to within tolerance, elementwise.
+
+    A chord spanning the angle step on a circle of radius r is at most
+    r*(1 - cos(step/2)) away from it.  No segment spans more than a third of
+    a turn, so full circles do not collapse.
+    """
+    with np.errstate(divide='ignore'):
+        step = 2*np.arccos(np.maximum(1.0 - tolerance/np.asarray(radius, dtype=np.float64), -1.0))
+    step = np.minimum(step, 2*math.pi/3)
+    return np.maximum(np.ceil(sweep / step), 1).astype(np.int64)
+
+def sample_arc(matrix, start, end, tolerance):
+    """Approximate an elliptic arc, as described in Ipe files, by a polygonal chain.
+
+    The ellipse is the image of the unit circle under the Ipe style matrix
+    (a, b, c, d, e, f), and the arc runs from start to end, counterclockwise as
+    seen on the unit circle.  If start and end coincide, it is the full ellipse.
+
+    Returns the (n-1, 2) array of points strictly between start and end, with
+    n the smallest number of segments for which no segment strays more than
+    tolerance from the arc (see _arc_segments).
+    """
+    if not tolerance > 0:
+        raise ValueError("Arc tolerance must be positive.")
+    a, b, c, d, e, f = matrix
+    det = a*d - b*c
+    if det == 0:
+        raise ValueError("Degenerate arc matrix %s."%(list(matrix),))
+
+    angles = []
+    for x, y in (start, end):
+        x, y = x - e, y - f
+        angles.append(math.atan2((a*y - b*x) / det, (d*x - c*y) / det))
+    sweep = (angles[1] - angles[0]) % (2*math.pi)
+    if sweep == 0:
+        sweep = 2*math.pi
+
+    # the matrix stretches the unit circle by at most its largest singular value.
+    radius = np.linalg.norm(((a, c), (b, d)), 2)
+    n = int(_arc_segments(sweep, radius, tolerance))
+
+    t = angles[0] + sweep * np.arange(1, n) / n
+    return AffineTransform().transformed(*matrix).apply(np.column_stack((np.cos(t), np.sin(t))))
+
+def sample_circular_arcs(starts, ends, centers, clockwise, tolerance):
+    """Approximate many circular arcs by polygonal chains at once.
+
+    Each arc runs from its start to its end around its center,
+    counterclockwise unless clockwise is set for it, and is a full circle if
+    start and end coincide.  Should start and end not be quite the same
+    distance from the center, the radius changes linearly along the arc.
+
+    Returns the array of points strictly between start and end of all arcs,
+    one arc after the other, and the array of how many of them belong to each
+    arc.  As with sample_arc, the number of segments for each arc is the
+    smallest for which none strays more than tolerance from it.
+    """
+    if not tolerance > 0:
+        raise ValueError("Arc tolerance must be positive.")
+    starts, ends, centers = (np.asarray(a, dtype=np.float64).reshape(-1, 2) for a in (starts, ends, centers))
+    direction = np.where(clockwise, -1.0, 1.0)
+
+    v0 = starts - centers
+    v1 = ends - centers
+    r0 = np.hypot(v0[:, 0], v0[:, 1])
+    r1 = np.hypot(v1[:, 0], v1[:, 1])
+    a0 = np.arctan2(v0[:, 1], v0[:, 0])
+    sweep = (direction * (np.arctan2(v1[:, 1], v1[:, 0]) - a0)) % (2*math.pi)
+    sweep[sweep == 0] = 2*math.pi
+
+    n = _arc_segments(sweep, np.maximum(r0, r1), tolerance)
+    counts = n - 1
+    arc = np.repeat(np.arange(len(n)), counts)
+    # the position of each point within its arc, from 1 to n-1
+    k = np.arange(1, len(arc) + 1) - np.repeat(np.cumsum(counts) - counts, counts)
+    fraction = k / n[arc]
+    angle = a0[arc] + direction[arc] * sweep[arc] * fraction
+    radius = r0[arc] + (r1[arc] - r0[arc]) * fraction
+    points = centers[arc] + radius[:, None] * np.column_stack((np.cos(angle), np.sin(angle)))
+    return points, counts
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Writing several output files at once."""
+
+import concurrent.futures
+import multiprocessing
+import threading
+
+_shared_writers = None # what write_files() works on, as inherited by forked worker processes
+_shared_lock = threading.Lock() # held while _shared_writers is set
+
+def _write_file(i, items=None):
+    write, path = (items if items is not None else _shared_writers)[i]
+    with open(path, 'wb') as f:
+        write(f)
+
+def write_files(writers, paths, jobs=1):
+    """Call every writer with the binary file object of the corresponding path opened for writing.
+
+    With jobs > 1 and several files, they are written by up to jobs forked
+    worker processes.  The workers inherit the writers (and the graphs they
+    write) rather than getting a copy.  Our writers mostly format text in
+    Python and hold the GIL, so threads would not run them concurrently.
+    Where fork is not available, the files are written one after another in
+    this process.  Either way, every path gets exactly what its writer writes,
+    and the first error is raised.  Calls from several threads write in
+    parallel one at a time.
+    """
+    global _shared_writers
+    items = list(zip(writers, paths))
+    parallel = jobs > 1 and len(items) > 1 and 'fork' in multiprocessing.get_all_start_methods()
+
+    if parallel:
+        with _shared_lock:
+            _shared_writers = items
+            try:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(items)), mp_context=multiprocessing.get_context('fork')) as executor:
+                    for _ in executor.map(_write_file, range(len(items))):
+                        pass
+            finally:
+                _shared_writers = None
+    else:
+        for i in range(len(items)):
+            _write_file(i, items)
@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Bulk parsing of whitespace separated text."""
+
+import concurrent.futures
+import multiprocessing
+import os
+import re
+import threading
+import warnings
+
+import numpy as np
+
+CHUNK_SIZE = 1 << 24
+PARALLEL_MIN_SIZE = 1 << 22
+
+def split_lines_at(data, size=CHUNK_SIZE):
+    """Split data (str, bytes or mmap) into pieces of about size characters, each ending in a newline.
+
+    Only the last piece may lack the trailing newline.  A line longer than
+    size is never split.
+
+    >>> list(split_lines_at(b"1 2\\n3 4\\n5 6\\n", 5))
+    [b'1 2\\n', b'3 4\\n', b'5 6\\n']
+    >>> list(split_lines_at("12345678\\n9", 4))
+    ['12345678\\n', '9']
+    >>> list(split_lines_at(b""))
+    []
+    """
+    for start, end in _line_bounds(data, size):
+        yield data[start:end]
+
+def _line_bounds(data, size):
+    """The (start, end) offsets of the pieces split_lines_at() makes."""
+    newline = '\n' if isinstance(data, str) else b'\n'
+    length = len(data)
+    start = 0
+    while start < length:
+        end = min(start + size, length)
+        if end < length:
+            cut = data.rfind(newline, start, end)
+            if cut < 0:
+                cut = data.find(newline, end)
+            end = length if cut < 0 else cut + 1
+        yield start, end
+        start = end
+
+def _has_token(piece):
+    return re.search(r'\S' if isinstance(piece, str) else rb'\S', piece) is not None
+
+def parse_floats(data):
+    """Parse whitespace separated numbers from data (str, bytes or mmap) into a float64 array.
+
+    Raises a ValueError if data holds anything else.
+
+    >>> parse_floats(b"1 2\\n 3.5\\t-4e1\\r\\n").tolist()
+    [1.0, 2.0, 3.5, -40.0]
+    >>> parse_floats(" \\n").tolist()
+    []
+    >>> parse_floats(b"1 x")
+    Traceback (most recent call last):
+     ...
+    ValueError: Cannot parse b'1 x' as numbers.
+    """
+    arrays = []
+    for piece in split_lines_at(data):
+        if not _has_token(piece): # numpy gives [-1.] for blank strings
+            continue
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', DeprecationWarning)
+            try:
+                arrays.append(np.fromstring(piece, sep=' '))
+            except (ValueError, DeprecationWarning):
+                raise ValueError("Cannot parse %s as numbers."%(piece[:32],)) from None
+    if len(arrays) == 1:
+        return arrays[0]
+    return np.concatenate(arrays) if arrays else np.empty(0)
+
+def count_nonblank_lines(data):
+    """Count the lines in data (str, bytes or mmap) that hold anything besides whitespace.
+
+    >>> count_nonblank_lines(b"3\\n  1 2\\n\\n \\t\\n4 5")
+    3
+    >>> count_nonblank_lines("")
+    0
+    """
+    count = 0
+    for piece in split_lines_at(data):
+        if isinstance(piece, str):
+            piece = piece.encode()
+        b = np.frombuffer(piece, dtype=np.uint8)
+        # Drop all whitespace (and control characters) but newlines; a line is
+        # not blank if some character follows its newline (or the start) in
+        # what remains.
+        b = b[(b == ord('\n')) | (b > ord(' '))]
+        starts = b[:-1] == ord('\n')
+        count += int(np.count_nonzero(starts & (b[1:] != ord('\n'))))
+        if len(b) > 0 and b[0] != ord('\n'):
+            count += 1
+    return count
+
+def count_tokens_per_line(data):
+    """Count the whitespace separated tokens on each line of data (str, bytes or mmap) that is not blank.
+
+    >>> count_tokens_per_line(b"3\\n  1 2\\n\\n \\t\\n4 5 6").tolist()
+    [1, 2, 3]
+    >>> count_tokens_per_line("").tolist()
+    []
+    """
+    counts = []
+    for piece in split_lines_at(data):
+        if isinstance(piece, str):
+            piece = piece.encode()
+        b = np.frombuffer(piece, dtype=np.uint8)
+        if len(b) == 0:
+            continue
+        blank = b <= ord(' ')
+        starts = ~blank
+        starts[1:] &= blank[:-1]
+        line_starts = np.concatenate(([0], np.flatnonzero(b == ord('\n')) + 1))
+        c = np.add.reduceat(starts, line_starts[line_starts < len(b)], dtype=np.int64)
+        counts.append(c[c > 0])
+    return np.concatenate(counts) if counts else np.empty(0, dtype=np.int64)
+
+def jobs_from_args(args):
+    """The number of processes a loader may parse with, as given by -j in args (all CPUs by default).
+
+    Loaders called without args, like the ones in tests and the modules'
+    own main(), parse in the calling process.
+    """
+    if args is None:
+        return 1
+    return getattr(args, 'jobs', None) or os.cpu_count() or 1
+
+_shared_data = None # the data scan_lines() works on, as inherited by forked worker processes
+_shared_lock = threading.Lock() # held while _shared_data is set
+
+def _scan_range(bounds, data=None):
+    start, end = bounds
+    piece = (data if data is not None else _shared_data)[start:end]
+    return parse_floats(piece), count_tokens_per_line(piece)
+
+def scan_lines(data, jobs=1):
+    """Parse data (str, bytes or mmap) into its numbers and the number of tokens on each nonblank line.
+
+    With jobs > 1, large inputs are cut into that many pieces at line
+    boundaries, which are parsed by as many worker processes.  The workers
+    are forked, so they share data (and an underlying mmap) rather than
+    getting a copy, and the results come back in input order.  Where fork is
+    not available, data is parsed in this process.  Calls from several
+    threads parse in parallel one at a time.
+
+    >>> numbers, tokens = scan_lines(b"2\\n1 2\\n3 4\\n")
+    >>> numbers.tolist(), tokens.tolist()
+    ([2.0, 1.0, 2.0, 3.0, 4.0], [1, 2, 2])
+    """
+    global _shared_data
+    parallel = jobs > 1 and len(data) >= PARALLEL_MIN_SIZE and 'fork' in multiprocessing.get_all_start_methods()
+    size = min(CHUNK_SIZE, len(data) // jobs + 1) if parallel else CHUNK_SIZE
+    bounds = list(_line_bounds(data, size))
+
+    if parallel and len(bounds) > 1:
+        with _shared_lock:
+            _shared_data = data
+            try:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=min(jobs, len(bounds)), mp_context=multiprocessing.get_context('fork')) as executor:
+                    results = list(executor.map(_scan_range, bounds))
+            finally:
+                _shared_data = None
+    else:
+        results = [_scan_range(b, data) for b in bounds]
+
+    if not results:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+def parse_blocks(data, jobs=1):
+    """Parse count-prefixed blocks of coordinate pairs, as in .line and .pnt files.
+
+    Each block is a line holding a count n, followed by n lines holding two
+    coordinates each; blank lines are ignored.  Returns the (m, 2) array of
+    all coordinates and the array of block lengths.  Block boundaries come
+    from which lines hold a single number, so no block has to be walked one
+    by one.  Raises a ValueError if data is not well formed.  jobs is passed
+    on to scan_lines().
+
+    >>> coordinates, lengths = parse_blocks(b"2\\n0 0\\n1 0\\n\\n1\\n5 5\\n")
+    >>> coordinates.tolist(), lengths.tolist()
+    ([[0.0, 0.0], [1.0, 0.0], [5.0, 5.0]], [2, 1])
+    >>> parse_blocks(b"3\\n0 0\\n1 0\\n")
+    Traceback (most recent call last):
+     ...
+    ValueError: Block lengths do not match their counts.
+    """
+    numbers, tokens = scan_lines(data, jobs)
+    if len(tokens) == 0:
+        return np.empty((0, 2)), np.empty(0, dtype=np.int64)
+    if ((tokens != 1) & (tokens != 2)).any():
+        raise ValueError("Expected a count or two coordinates on each line.")
+    heads = np.flatnonzero(tokens == 1)
+    if len(heads) == 0 or heads[0] != 0:
+        raise ValueError("Expected a count on the first line.")
+
+    count_at = (np.cumsum(tokens) - tokens)[heads]
+    lengths = np.diff(np.append(heads, len(tokens))) - 1
+    if (numbers[count_at] != lengths).any():
+        raise ValueError("Block lengths do not match their counts.")
+    keep = np.ones(len(numbers), dtype=bool)
+    keep[count_at] = False
+    return numbers[keep].reshape(-1, 2), lengths
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Timing and memory accounting of the phases of a conversion."""
+
+from contextlib import contextmanager
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+_hooks = []
+
+def add_hook(hook):
+    """Have hook(phase) called with every Phase that finishes from now on, in any PhaseTimer."""
+    _hooks.append(hook)
+
+def remove_hook(hook):
+    """Stop calling a hook passed to add_hook()."""
+    _hooks.remove(hook)
+
+def _peak_rss():
+    """The peak resident set size of this process so far, in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+class Phase:
+    """What one phase of a conversion took.
+
+    wall and cpu are in seconds.  elements is the number of vertices and
+    edges the phase handled, if that makes sense for it.  peak_rss is the
+    peak resident set size of the process up to the end of the phase, and
+    peak_traced the peak of memory allocated by Python during the phase, as
+    seen by tracemalloc (None unless memory is traced), both in bytes.
+    """
+    def __init__(self, name, source=None):
+        self.name = name
+        self.source = source
+        self.wall = None
+        self.cpu = None
+        self.elements = None
+        self.peak_rss = None
+        self.peak_traced = None
+
+    def __repr__(self):
+        return "%s(%r, wall=%r, elements=%r)"%(self.__class__.__name__, self.name, self.wall, self.elements)
+
+    def as_dict(self):
+        return { k: getattr(self, k) for k in ('name', 'source', 'wall', 'cpu', 'elements', 'peak_rss', 'peak_traced') }
+
+class PhaseTimer:
+    """Record the phases of the conversion of source.
+
+    With trace_memory set, tracemalloc is started (if it is not running yet)
+    to also find the peak of Python allocations in each phase; this slows
+    things down noticeably.
+    """
+    def __init__(self, source=None, trace_memory=False):
+        self.source = source
+        self.trace_memory = trace_memory
+        self.phases = []
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase name.
+
+        Yields the Phase, so the block can fill in its elements."""
+        p = Phase(name, self.source)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        yield p
+        p.wall = time.perf_counter() - wall
+        p.cpu = time.process_time() - cpu
+        p.peak_rss = _peak_rss()
+        if self.trace_memory:
+            p.peak_traced = tracemalloc.get_traced_memory()[1]
+        self.phases.append(p)
+        for hook in list(_hooks):
+            hook(p)
+
+    def report(self, f, fmt='text'):
+        """Write the phases recorded so far to the text file f, as a table or as JSON."""
+        if fmt == 'json':
+            json.dump({'source': self.source, 'phases': [p.as_dict() for p in self.phases]}, f)
+            f.write("\n")
+            return
+
+        def mb(n):
+            return "%12.1f"%(n / 2**20,) if n is not None else "%12s"%("-",)
+        f.write("%s:\n"%(self.source,))
+        f.write("  %-10s %10s %10s %12s %12s %12s\n"%("phase", "wall s", "cpu s", "elements", "peak RSS MB", "traced MB"))
+        for p in self.phases:
+            f.write("  %-10s %10.3f %10.3f %12s %s %s\n"%(p.name, p.wall, p.cpu, p.elements if p.elements is not None else "-",
+                                                          mb(p.peak_rss), mb(p.peak_traced)))
+        f.write("  %-10s %10.3f %10.3f\n"%("total", sum(p.wall for p in self.phases), sum(p.cpu for p in self.phases)))
@@ -0,0 +1,469 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Conversion between graph formats, as done by ord-format, for use in-process.
+
+Call convert() to convert a path, bytes or a binary file object and get the
+output back, or have it written to files or a file object, with options()
+to set up what ord-format's command line options would:
+
+>>> out, = convert(b"3\\n0 0\\n1 0\\n1 1\\n", args=options(obj=True))
+>>> out.splitlines()[-2:]
+[b'f 1 2', b'f 2 3']
+
+Calls share no state apart from the cache directory they are told to use,
+so they may run concurrently in several threads.  Only tracing memory for
+timings (trace_memory) affects the whole process.
+"""
+
+from ORD53.formats.Line import LineLoader
+from ORD53.formats.Poly import PolyLoader
+from ORD53.formats.Point import PointLoader
+from ORD53.formats.Ipe import IpeLoader
+from ORD53.formats.Obj import ObjLoader
+from ORD53.formats.Site import SiteLoader
+from ORD53.formats.GraphML import GraphMLLoader
+from ORD53.formats.Binary import BinaryLoader
+from ORD53.formats.sniff import sniff_extension, CERTAIN_EXTENSIONS
+from ORD53.common.content import read_input
+from ORD53.common.cache import ConversionCache
+from ORD53.common.geometry import AffineTransform
+from ORD53.common.output import write_files
+from ORD53.common.parse import jobs_from_args
+from ORD53.common.timing import PhaseTimer
+import argparse
+import concurrent.futures
+import functools
+import io
+import numpy
+import os
+import shutil
+import sys
+
+PARALLEL_WRITE_MIN = 1 << 16 # vertices and edges from which several graphs are written in parallel
+
+class ConversionError(Exception):
+    """Exception raised when no loader can make sense of an input, or the options do not fit it."""
+    pass
+
+def write_graph(args, g, f):
+    if args.ipe:
+        g.write_ipe(f, args.ipe_markers)
+    elif args.obj:
+        g.write_obj(f,args.obj_zero)
+    elif args.binary:
+        g.write_binary(f)
+    else:
+        g.write_graphml(f)
+
+def output_extension(args):
+    if args.ipe:
+        return '.ipe'
+    elif args.obj:
+        return '.obj'
+    elif args.binary:
+        return BinaryLoader.extension
+    else:
+        return '.graphml'
+
+loaders = [ GraphMLLoader, LineLoader, PointLoader, PolyLoader, IpeLoader, ObjLoader, SiteLoader, BinaryLoader ]
+
+def _pick_extension(content, name, args):
+    """Return the extension of the loader to use, see input_extension(), and whether it is certain.
+
+    Only formats given by args.format, by name's extension, or recognized
+    for sure by sniff_extension() are certain."""
+    if args.format is not None:
+        return '.' + args.format, True
+    _, ext = os.path.splitext(name)
+    if ext in (l.extension for l in loaders):
+        return ext, True
+    ext = sniff_extension(content) or ''
+    return ext, ext in CERTAIN_EXTENSIONS
+
+def input_extension(content, name, args):
+    """The extension of the loader to use: by args.format, else by name's extension, else by content.
+
+    An empty string means no loader could be picked."""
+    return _pick_extension(content, name, args)[0]
+
+def load_graphs(content, name, args):
+    """Load a list of graphs, or return None if no loader found any.
+
+    A loader that returns no graphs or an empty first graph counts as
+    having found nothing.  If input_extension() picks a loader for certain,
+    only that one is used, and its exceptions are raised.  Otherwise, the
+    loader guessed from the contents (if any) is tried first, then all
+    others in turn.  Their exceptions are ignored, and the first one that
+    finds graphs wins.  Selecting a graph with args.graph is only possible
+    for GraphML input, for other input ConversionError is raised."""
+    ext, certain = _pick_extension(content, name, args)
+    if args.graph is not None and ext != GraphMLLoader.extension:
+        raise ConversionError("--graph only applies to GraphML input, not to %s."%(ext or "input of unknown format",))
+    if certain:
+        candidates = [l for l in loaders if l.extension == ext]
+    else:
+        candidates = sorted(loaders, key=lambda l: l.extension != ext)
+
+    graphs = None
+    for l in candidates:
+        try:
+            graphs = l.load(content, name, args)
+            if isinstance(graphs, list):
+                if len(graphs) > 0 and len(graphs[0].vertices) > 0:
+                    break
+            elif graphs is not None and len(graphs.vertices) > 0:
+                break
+            graphs = None
+        except Exception as e:
+            if certain: raise e
+
+    if graphs is not None and not isinstance(graphs, list):
+        graphs = [graphs]
+    return graphs
+
+class TransformAction(argparse.Action):
+    """Collect transformation steps, in the order they are given, in args.transforms."""
+    def __call__(self, parser, namespace, values, option_string=None):
+        steps = list(getattr(namespace, self.dest) or [])
+        steps.append((self.const, values if isinstance(values, list) else [values]))
+        setattr(namespace, self.dest, steps)
+
+def make_transform(steps, g):
+    """Build the AffineTransform for g from a list of (step, arguments) as collected by TransformAction."""
+    transform = AffineTransform()
+    for step, values in steps:
+        if step == 'normalize':
+            transform = transform.normalized(g.coordinates)
+        else:
+            transform = getattr(transform, step)(*values)
+    return transform
+
+def count_elements(graphs):
+    """The number of vertices and edges in graphs, as reported in timings."""
+    return sum(len(g.vertices) + len(g.edges) for g in graphs)
+
+def process_graphs(graphs, args, timer):
+    """Apply weight randomization, coordinate transformations and snapping as requested in args."""
+    if args.randomize_weights:
+        with timer.phase('randomize') as p:
+            rng = numpy.random.default_rng(args.seed)
+            for g in graphs:
+                kwargs = {'rng': rng}
+                if args.randomize_min is not None: kwargs['rnd_lower'] = args.randomize_min
+                if args.randomize_max is not None: kwargs['rnd_upper'] = args.randomize_max
+                if args.randomize_digits is not None: kwargs['round_n'] = args.randomize_digits
+                g.randomize_weights(**kwargs)
+            p.elements = sum(len(g.edges) for g in graphs)
+
+    if args.transforms:
+        with timer.phase('transform') as p:
+            for g in graphs:
+                merged = g.transform_coordinates(transform=make_transform(args.transforms, g), on_collision=args.on_collision)
+                if merged > 0:
+                    print("%s: merged %d vertices that the transformation made coincide"%(g.source, merged), file=sys.stderr)
+            p.elements = sum(len(g.vertices) for g in graphs)
+
+    if args.snap is not None:
+        with timer.phase('snap') as p:
+            for g in graphs:
+                merged = g.snap_vertices(args.snap)
+                print("%s: merged %d vertices within %g of another one"%(g.source, merged, args.snap), file=sys.stderr)
+            p.elements = sum(len(g.vertices) for g in graphs)
+
+def output_names(outputfile, count, args):
+    """The names of the files for count graphs written to outputfile."""
+    start, ext = os.path.splitext(os.fspath(outputfile))
+    return [("%s-%03d%s"%(start, i, ext) if not args.flatten else outputfile) for i in range(count)]
+
+def write_jobs(graphs, args):
+    """The number of processes to write graphs with, as given by -j in args.
+
+    Small outputs are not worth forking for, and flattened ones all go to
+    the same file."""
+    if args.flatten or count_elements(graphs) < PARALLEL_WRITE_MIN:
+        return 1
+    return jobs_from_args(args)
+
+def write_graphs(graphs, output, args):
+    """Write graphs to output, see convert() for what it can be.
+
+    Files named after a path are written several at once if large enough."""
+    if output is None:
+        outputs = []
+        for g in graphs:
+            f = io.BytesIO()
+            write_graph(args, g, f)
+            outputs.append(f.getvalue())
+        return outputs
+    elif hasattr(output, 'write'):
+        for g in graphs:
+            write_graph(args, g, output)
+        return None
+    else:
+        names = output_names(output, len(graphs), args)
+        write_files([functools.partial(write_graph, args, g) for g in graphs], names, write_jobs(graphs, args))
+        return names
+
+def copy_outputs(files, output, args):
+    """Copy open files holding one written graph each to where write_graphs would have written them, and close them."""
+    try:
+        if output is None:
+            return [f.read() for f in files]
+        elif hasattr(output, 'write'):
+            for f in files:
+                shutil.copyfileobj(f, output)
+            return None
+        else:
+            names = output_names(output, len(files), args)
+            for f, fn in zip(files, names):
+                with open(fn, 'wb') as out:
+                    shutil.copyfileobj(f, out)
+            return names
+    finally:
+        for f in files:
+            f.close()
+
+def cache_key(content, name, args):
+    """The cache key for converting content, or None if the result must not be cached."""
+    if args.randomize_weights and args.seed is None:
+        return None
+    if args.randomize_weights:
+        randomize = [args.seed, args.randomize_min, args.randomize_max, args.randomize_digits]
+    else:
+        randomize = None
+    return ConversionCache.make_key(content,
+        loader=input_extension(content, name, args),
+        output=output_extension(args),
+        options=[args.ipe_markers, args.obj_zero, args.flatten, args.graph, args.arc_tolerance, args.transforms, args.on_collision, args.snap],
+        randomize=randomize,
+        source=name,
+        program=os.path.basename(sys.argv[0]))
+
+def convert_content(content, name, output, args, timer=None):
+    """Convert content (bytes or mmap) read from name, see convert().
+
+    With args.cache set, results are taken from and stored in the cache.
+    The phases of the conversion are recorded in timer, and reported on
+    stderr as asked for by args.timings."""
+    if timer is None:
+        timer = PhaseTimer(name, trace_memory=args.trace_memory)
+    try:
+        return _convert(content, name, output, args, timer)
+    finally:
+        if args.timings:
+            timer.report(sys.stderr, args.timings)
+
+def _convert(content, name, output, args, timer):
+    cache = ConversionCache(args.cache, args.cache_size * 2**20) if args.cache is not None else None
+    key = cache_key(content, name, args) if cache is not None else None
+    if key is not None:
+        with timer.phase('cache'):
+            files = cache.get(key)
+            if files is not None:
+                return copy_outputs(files, output, args)
+
+    graphs = _load(content, name, args, timer)
+    with timer.phase('write') as p:
+        if key is None:
+            result = write_graphs(graphs, output, args)
+        else:
+            files = cache.put(key, [functools.partial(write_graph, args, g) for g in graphs], write_jobs(graphs, args))
+            result = copy_outputs(files, output, args)
+        p.elements = count_elements(graphs)
+    return result
+
+def _load(content, name, args, timer):
+    """Load and process the graphs in content, or raise ConversionError."""
+    with timer.phase('load') as p:
+        graphs = load_graphs(content, name, args)
+        if graphs is None:
+            raise ConversionError("No loader found.")
+        p.elements = count_elements(graphs)
+    process_graphs(graphs, args, timer)
+    return graphs
+
+def convert_file(args, inputfile, outputfile):
+    """Convert the file inputfile, writing to files named after outputfile.
+
+    This is what a batch job does; errors are raised, not reported."""
+    timer = PhaseTimer(inputfile, trace_memory=args.trace_memory)
+    with open(inputfile, 'rb') as f, timer.phase('read'):
+        content = read_input(f)
+    os.makedirs(os.path.dirname(outputfile) or '.', exist_ok=True)
+    convert_content(content, inputfile, outputfile, args, timer)
+
+def batch_jobs(srcdir, dstdir, args):
+    """List (inputfile, outputfile) for all files in srcdir that we have a loader for.
+
+    Output files are named after the input file with the extension replaced,
+    or appended if several inputs in a directory share a name otherwise."""
+    extensions = set(l.extension for l in loaders)
+    jobs = []
+    for dirpath, dirnames, filenames in os.walk(srcdir):
+        dirnames.sort()
+        filenames = [fn for fn in sorted(filenames) if os.path.splitext(fn)[1] in extensions]
+        stems = [os.path.splitext(fn)[0] for fn in filenames]
+        outdir = os.path.normpath(os.path.join(dstdir, os.path.relpath(dirpath, srcdir)))
+        for fn, stem in zip(filenames, stems):
+            base = stem if stems.count(stem) == 1 else fn
+            jobs.append((os.path.join(dirpath, fn), os.path.join(outdir, base + output_extension(args))))
+    return jobs
+
+def run_batch(args):
+    """Convert all files below one directory into another one, in parallel.
+
+    Failures are reported per file and do not stop the run.  Returns the number of failed files."""
+    srcdir, dstdir = args.batch
+    jobs = batch_jobs(srcdir, dstdir, args)
+
+    job_args = argparse.Namespace(**vars(args))
+    job_args.inputfile = None
+    job_args.jobs = 1 # the files are converted in parallel already
+
+    failed = 0
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = { executor.submit(convert_file, job_args, i, o): i for i, o in jobs }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print("%s: %s"%(futures[future], e), file=sys.stderr)
+    print("Converted %d of %d files."%(len(jobs) - failed, len(jobs)), file=sys.stderr)
+    return failed
+
+
+def argument_parser():
+    """The command line parser of ord-format.
+
+    Without an inputfile, stdin is to be read; without an outputfile,
+    output goes to stdout."""
+    parser = argparse.ArgumentParser(description='Load a graph and output it in ord53 format')
+    parser.add_argument('inputfile', help='Inputfile', nargs='?', type=argparse.FileType('rb'), default=None)
+    parser.add_argument('outputfile', help='Outputfile (.graphml)', nargs='?')
+    parser.add_argument('-I', '--ipe', action='store_true', default=False, help='create ipe output')
+    parser.add_argument('-O', '--obj', action='store_true', default=False, help='create obj output')
+    parser.add_argument('-Z', '--obj-zero', action='store_true', default=False, help='zero offset obj output')
+    parser.add_argument('-B', '--binary', action='store_true', default=False, help='create binary output')
+    parser.add_argument('-M', '--ipe-markers', action='store_true', default=False, help='add markers to vertices in ipe output')
+    parser.add_argument('-f', '--flatten', action='store_true', default=False, help='flatten views and pages')
+    parser.add_argument('--graph', metavar='N', type=int, default=None, help='only load graph N (counting from 0) of graphml input with several graphs')
+    parser.add_argument('--arc-tolerance', metavar='TOL', type=float, default=None, help='how far segments replacing arcs may stray from them (default: %s for ipe, %s for site input)'%(IpeLoader.ARC_TOLERANCE, SiteLoader.ARC_TOLERANCE))
+    parser.add_argument('-r', '--randomize-weights', action='store_true', default=False, help='randomize edge weights')
+    parser.add_argument('--randomize-min', metavar='RND_MIN', type=float, default=None, help='smallest edge weight')
+    parser.add_argument('--randomize-max', metavar='RND_MAX', type=float, default=None, help='largest edge weight')
+    parser.add_argument('-R', '--randomize-digits', metavar='RND_DIGITS', type=int, default=None, help='round random weight to this many digits')
+    parser.add_argument('--seed', metavar='SEED', type=int, default=None, help='seed for random edge weights')
+    parser.add_argument('-S', '--scale', dest='transforms', action=TransformAction, const='scaled', metavar='FACTOR', type=float, help='scale input by factor')
+    parser.add_argument('--translate', dest='transforms', action=TransformAction, const='translated', nargs=2, metavar=('DX', 'DY'), type=float, help='move input by (DX, DY)')
+    parser.add_argument('--rotate', dest='transforms', action=TransformAction, const='rotated', metavar='DEGREES', type=float, help='rotate input counterclockwise around the origin')
+    parser.add_argument('--matrix', dest='transforms', action=TransformAction, const='transformed', nargs=6, metavar=('A', 'B', 'C', 'D', 'E', 'F'), type=float, help='transform input by the matrix A B C D E F, as in Ipe')
+    parser.add_argument('--normalize', dest='transforms', action=TransformAction, const='normalize', nargs=0, help='scale and move input into the unit box')
+    parser.add_argument('--on-collision', choices=('error', 'merge'), default='error', help='what to do when transformations make vertices coincide (default: error)')
+    parser.add_argument('--snap', metavar='EPS', type=float, help='merge vertices closer than EPS')
+    parser.add_argument('-F', '--format', choices=[l.extension[1:] for l in loaders], help='input format (default: by extension or content)')
+    parser.add_argument('--batch', nargs=2, metavar=('SRC_DIR', 'DST_DIR'), help='convert all files below SRC_DIR into DST_DIR')
+    parser.add_argument('--cache', metavar='DIR', help='reuse earlier results stored in DIR (with -r only if --seed is given)')
+    parser.add_argument('--cache-size', metavar='MB', type=int, default=1024, help='size limit of the cache (default: 1024)')
+    parser.add_argument('--timings', nargs='?', const='text', choices=('text', 'json'), help='report time, elements and memory use of each phase on stderr')
+    parser.add_argument('--trace-memory', action='store_true', default=False, help='also trace peak Python allocations per phase for --timings (slow)')
+    parser.add_argument('--profile', metavar='FILE', help='write cProfile statistics of the conversion to FILE')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int, default=None, help='number of parallel jobs in batch mode, for parsing large .line, .poly and .pnt files, and for writing several large output graphs (default: number of CPUs)')
+    return parser
+
+def options(**kwargs):
+    """Return the options for a conversion, as a namespace like the parsed command line of ord-format.
+
+    Options not given in kwargs have their command line defaults, except
+    for jobs, which is 1 so that conversions stay in the calling thread.
+    Options are named after the long command line options, with dashes
+    replaced by underscores, like ipe_markers or randomize_min.  The
+    transformations are given as transforms, a list of (step, arguments)
+    like [('scaled', [2.0]), ('rotated', [90.0])], see make_transform().
+    """
+    args = argument_parser().parse_args([])
+    args.jobs = 1
+    for k, v in kwargs.items():
+        if not hasattr(args, k):
+            raise TypeError("Unknown option '%s'"%(k,))
+        setattr(args, k, v)
+    return args
+
+def _source_name(source, name):
+    """The name to load source under: name if given, else the path or name of the file."""
+    if name is not None:
+        return name
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, 'name', "unknown")
+
+def _read(source):
+    """Return the contents of source, a path, bytes or a binary file object."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return read_input(f)
+    return read_input(source)
+
+def load(source, name=None, args=None, timer=None):
+    """Load the graphs in source and apply weight randomization, transformations and snapping.
+
+    source and name are as for convert().  Returns a list of graphs, or
+    raises ConversionError if no loader could make sense of source."""
+    if args is None:
+        args = options()
+    name = _source_name(source, name)
+    if timer is None:
+        timer = PhaseTimer(name, trace_memory=args.trace_memory)
+    with timer.phase('read'):
+        content = _read(source)
+    return _load(content, name, args, timer)
+
+def convert(source, output=None, name=None, args=None, timer=None):
+    """Convert source as ord-format would, with the options args (see options()).
+
+    source is the path of a file, bytes, or a binary file object to read.
+    The input format is taken from args.format, or else from the extension
+    of name (by default the path or file name of source), or else guessed
+    from the contents.
+
+    With output None, the output for each graph is returned as a list of
+    bytes.  With a binary file object, all output is written to it, one
+    graph after another, and None returned.  Otherwise, output is a path,
+    the output goes to files named after it as ord-format names them, and
+    the list of their names is returned.
+
+    Raises ConversionError if no loader could make sense of source.  The
+    phases of the conversion are recorded in timer, if given.
+    """
+    if args is None:
+        args = options()
+    name = _source_name(source, name)
+    if timer is None:
+        timer = PhaseTimer(name, trace_memory=args.trace_memory)
+    with timer.phase('read'):
+        content = _read(source)
+    return convert_content(content, name, output, args, timer)
@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Loader for graphs in ORD53's binary format.
+
+The layout is described with GeometricGraph.BINARY_HEADER.  The arrays are
+used straight from the input buffer, so a memory mapped file is not read
+until its data is needed.
+"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+from ORD53.graph.Graph import GeometricGraph, ColumnarGeometricGraph
+
+import numpy as np
+import os
+
+class BinaryLoader:
+    extension = '.ordg'
+
+    """Load a graph from binary format"""
+    @classmethod
+    def load(cls, content, name="unknown", args=None):
+        """Load graph from a valid binary file"""
+        if isinstance(content, str):
+            raise ValueError("Binary graphs cannot be loaded from text.")
+        header = GeometricGraph.BINARY_HEADER
+        if len(content) < header.size:
+            raise ValueError("Truncated binary graph header.")
+        magic, version, dim, flags, _, nv, ne = header.unpack_from(content)
+        if magic != GeometricGraph.BINARY_MAGIC:
+            raise ValueError("Not a binary graph.")
+        if version != GeometricGraph.BINARY_VERSION:
+            raise ValueError("Unsupported binary graph version %d."%(version,))
+        if dim not in (2, 3):
+            raise ValueError("Unsupported dimension %d."%(dim,))
+
+        has_w = bool(flags & GeometricGraph.BINARY_FLAG_W)
+        has_wa = bool(flags & GeometricGraph.BINARY_FLAG_WA)
+        size = header.size + 8*nv*dim + 8*ne + 8*ne*(has_w + has_wa)
+        if len(content) != size:
+            raise ValueError("Binary graph has %d bytes, expected %d."%(len(content), size))
+
+        offset = header.size
+        coordinates = np.frombuffer(content, dtype='<f8', count=nv*dim, offset=offset).reshape(nv, dim)
+        offset += 8*nv*dim
+        edges = np.frombuffer(content, dtype='<u4', count=2*ne, offset=offset).reshape(ne, 2)
+        offset += 8*ne
+        weights = []
+        for present in (has_w, has_wa):
+            if present:
+                weights.append(np.frombuffer(content, dtype='<f8', count=ne, offset=offset))
+                offset += 8*ne
+            else:
+                weights.append(None)
+
+        g = ColumnarGeometricGraph.from_arrays(coordinates, edges, *weights,
+                                               source=name, fmt=os.path.basename(__file__))
+        g._w_integral = has_w and bool(flags & GeometricGraph.BINARY_FLAG_W_INTEGRAL)
+        return g
+
+def main():
+    """Load a graph from stdin or a file."""
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Load a graph from a binary graph file')
+    parser.add_argument('inputfile', help='Inputfile (.ordg)', nargs='?', type=argparse.FileType('rb'), default=sys.stdin.buffer)
+    parser.add_argument('outputfile', help='Outputfile (.graphml)', nargs='?', type=argparse.FileType('wb'), default=sys.stdout.buffer)
+    parser.add_argument('-r', '--randomize-weights', action='store_true', default=False, help='randomize edge weights')
+
+    args = parser.parse_args()
+
+    g = BinaryLoader.load(args.inputfile.read())
+    if args.randomize_weights:
+      g.randomize_weights()
+    g.write_graphml(args.outputfile)
+    args.outputfile.close()
+
+if __name__ == '__main__' and __package__ is None:
+    main()
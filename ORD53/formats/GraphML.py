@@ -35,6 +35,7 @@ from ORD53.graph.Graph import GeometricGraph
 from ORD53.common.IndexedSet import IndexedSet
 from ORD53.common.geometry import Vertex2
 from ORD53.common.iter import pair_iterator, PeekIterator
+from ORD53.common.content import as_file
 
 import os
 import sys
@@ -43,86 +44,206 @@ class GraphMLLoader:
     extension = '.graphml'
 
     @staticmethod
-    def _load_item(item, keys, tags):
-        item_attrs = {}
+    def _resolve_keys(keys):
+        """Split the key declarations for one kind of item into the id to
+        attr.name mapping and the attr.name to default value mapping."""
+        names = {}
+        defaults = {}
+        for k, h in keys.items():
+            names[k] = h['attr.name']
+            if h.get('default') is not None:
+                defaults[h['attr.name']] = h['default']
+        return names, defaults
+
+    @staticmethod
+    def _load_item(item, names, defaults, tags):
+        res = dict(defaults)
         for data in item:
             if data.tag != tags['data']: continue
-            if not 'key' in data.attrib: raise Exception("data has no key!")
-            k = data.attrib['key']
-            if not k in keys: raise Exception("Unknown key " + k)
-            item_attrs[k] = data.text
-
-        res = {}
-        for k in keys:
-            if k in item_attrs: value = item_attrs[k]
-            else: value = keys[k]['default']
-            if value is not None:
-                res[keys[k]['attr.name']] = value
+            k = data.get('key')
+            if k is None: raise Exception("data has no key!")
+            if not k in names: raise Exception("Unknown key " + k)
+            if data.text is not None:
+                res[names[k]] = data.text
+            else:
+                res.pop(names[k], None)
         return res
 
     @staticmethod
-    def _load_graphml(source, fmt, content):
-        graphs = []
-        g = GeometricGraph(source=source, fmt=fmt)
-        tags = g.get_tags()
+    def _consume(elem):
+        """Free an element we are done with, along with any siblings before it."""
+        elem.clear()
+        parent = elem.getparent()
+        while elem.getprevious() is not None:
+            del parent[0]
+
+    @staticmethod
+    def _load_graphml(source, fmt, content, select=None):
+        """Load all graphs from a graphml document in a single pass.
 
-        root = ET.fromstring(content.encode())
-        if not root.tag == tags['graphml']:
-            raise Exception("Not a graphml file")
+        The document is parsed incrementally, and nodes and edges are
+        discarded as soon as they have been added to their graph, so the
+        XML tree never holds more than the element at hand.
+
+        With select, a set of indices of top-level graphs (counting from 0),
+        only those graphs are loaded.  The nodes and edges of all others are
+        discarded unseen, and parsing stops after the last selected graph."""
+        graphs = []
+        index = 0
+        tags = GeometricGraph(source=source, fmt=fmt).get_tags()
 
         keys_attrs_edge = {}
         keys_attrs_node = {}
 
-        for child in root:
-            if child.tag != tags['key']: continue
-
-            a = None
-            if child.attrib['for'] == "node": a = keys_attrs_node
-            if child.attrib['for'] == "edge": a = keys_attrs_edge
-            if a is not None:
-                h = { 'attr.name': child.attrib['attr.name'] }
-                default = child.find(tags['default'])
-                if default is not None:
-                    h['default'] = default.text
-                a[child.attrib['id']] = h
-            else:
-                print("Ignoring unknown key", ET.tostring(child), file=sys.stderr)
-
-        for graph in root:
-            if graph.tag != tags['graph']: continue
-
-            vertices = {}
-            for child in graph:
-                if child.tag != tags['node']: continue
-                if not 'id' in child.attrib: raise Exception("Node has no id!")
-
-                id = child.attrib['id']
-                node_data = GraphMLLoader._load_item(child, keys_attrs_node, tags)
-                if not 'vertex-coordinate-x' in node_data: raise Exception("No vertex-coordinate-x for node")
-                if not 'vertex-coordinate-y' in node_data: raise Exception("No vertex-coordinate-y for node")
-                vertices[id] = g.add_vertex( Vertex2(node_data['vertex-coordinate-x'], node_data['vertex-coordinate-y']) )
-
-            for child in graph:
-                if child.tag != tags['edge']: continue
-                if not 'source' in child.attrib: raise Exception("Edge has no source!")
-                if not 'target' in child.attrib: raise Exception("Edge has no target!")
-
-                idx0 = vertices[ child.attrib['source'] ]
-                idx1 = vertices[ child.attrib['target'] ]
-
-                edge_data = GraphMLLoader._load_item(child, keys_attrs_edge, tags)
-                w = edge_data.get('edge-weight', None)
-                wa = edge_data.get('edge-weight-additive', None)
-                if w == g.DEFAULT_W: w = None
-                if wa == g.DEFAULT_WA: wa = None
-                g.add_edge_by_index(idx0, idx1, w=w, wa=wa)
-
-            graphs.append(g)
-            g = GeometricGraph(source=source, fmt=fmt)
+        root = None
+        g = None
+        with as_file(content) as f:
+            for event, elem in ET.iterparse(f, events=('start', 'end'), huge_tree=True):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        if not root.tag == tags['graphml']:
+                            raise Exception("Not a graphml file")
+                    elif elem.tag == tags['graph'] and elem.getparent() is root and (select is None or index in select):
+                        g = GeometricGraph(source=source, fmt=fmt)
+                        vertices = {}
+                        pending_edges = []
+                        node_names, node_defaults = GraphMLLoader._resolve_keys(keys_attrs_node)
+                        edge_names, edge_defaults = GraphMLLoader._resolve_keys(keys_attrs_edge)
+                    continue
+
+                parent = elem.getparent()
+                if parent is None:
+                    break
+                elif parent is root:
+                    if elem.tag == tags['key']:
+                        a = None
+                        if elem.attrib['for'] == "node": a = keys_attrs_node
+                        if elem.attrib['for'] == "edge": a = keys_attrs_edge
+                        if a is not None:
+                            h = { 'attr.name': elem.attrib['attr.name'] }
+                            default = elem.find(tags['default'])
+                            if default is not None:
+                                h['default'] = default.text
+                            a[elem.attrib['id']] = h
+                        else:
+                            print("Ignoring unknown key", ET.tostring(elem), file=sys.stderr)
+                    elif elem.tag == tags['graph']:
+                        if g is not None:
+                            for edge in pending_edges:
+                                GraphMLLoader._add_edge(g, vertices, *edge)
+                            graphs.append(g)
+                            g = None
+                        index += 1
+                        if select is not None and index > max(select, default=-1):
+                            break
+                    GraphMLLoader._consume(elem)
+                elif parent.tag == tags['graph'] and parent.getparent() is root:
+                    if g is None:
+                        pass # a graph that was not selected
+                    elif elem.tag == tags['node']:
+                        if not 'id' in elem.attrib: raise Exception("Node has no id!")
+
+                        id = elem.attrib['id']
+                        node_data = GraphMLLoader._load_item(elem, node_names, node_defaults, tags)
+                        if not 'vertex-coordinate-x' in node_data: raise Exception("No vertex-coordinate-x for node")
+                        if not 'vertex-coordinate-y' in node_data: raise Exception("No vertex-coordinate-y for node")
+                        vertices[id] = g.add_vertex( Vertex2(node_data['vertex-coordinate-x'], node_data['vertex-coordinate-y']) )
+                    elif elem.tag == tags['edge']:
+                        if not 'source' in elem.attrib: raise Exception("Edge has no source!")
+                        if not 'target' in elem.attrib: raise Exception("Edge has no target!")
+
+                        edge_data = GraphMLLoader._load_item(elem, edge_names, edge_defaults, tags)
+                        edge = (elem.attrib['source'], elem.attrib['target'], edge_data)
+                        # Edges may refer to nodes declared further down.  Once we
+                        # have to wait for one, keep the rest in order behind it.
+                        if pending_edges or edge[0] not in vertices or edge[1] not in vertices:
+                            pending_edges.append(edge)
+                        else:
+                            GraphMLLoader._add_edge(g, vertices, *edge)
+                    GraphMLLoader._consume(elem)
         return graphs
 
+    @staticmethod
+    def _add_edge(g, vertices, source, target, edge_data):
+        if not source in vertices: raise Exception("Unknown source node " + source)
+        if not target in vertices: raise Exception("Unknown target node " + target)
+        idx0 = vertices[source]
+        idx1 = vertices[target]
+
+        w = edge_data.get('edge-weight', None)
+        wa = edge_data.get('edge-weight-additive', None)
+        if w == g.DEFAULT_W: w = None
+        if wa == g.DEFAULT_WA: wa = None
+        g.add_edge_by_index(idx0, idx1, w=w, wa=wa)
+
+    @staticmethod
+    def _count_graphml(content):
+        """Return the id, number of nodes and number of edges of every top-level graph."""
+        counts = []
+        tags = GeometricGraph().get_tags()
+        root = None
+        with as_file(content) as f:
+            for event, elem in ET.iterparse(f, events=('start', 'end'), huge_tree=True):
+                if event == 'start':
+                    if root is None:
+                        root = elem
+                        if not root.tag == tags['graphml']:
+                            raise Exception("Not a graphml file")
+                    elif elem.tag == tags['graph'] and elem.getparent() is root:
+                        counts.append([elem.get('id'), 0, 0])
+                    continue
+
+                parent = elem.getparent()
+                if parent is None:
+                    break
+                elif parent is root:
+                    GraphMLLoader._consume(elem)
+                elif parent.tag == tags['graph'] and parent.getparent() is root:
+                    if elem.tag == tags['node']:
+                        counts[-1][1] += 1
+                    elif elem.tag == tags['edge']:
+                        counts[-1][2] += 1
+                    GraphMLLoader._consume(elem)
+        return [tuple(c) for c in counts]
+
     @classmethod
-    def load(cls, content, name="unknown", args=None):
-        g = cls._load_graphml(source=name, fmt=os.path.basename(__file__), content=content)
+    def scan(cls, content, name="unknown"):
+        """Return a GraphMLHandle for every top-level graph in content, without loading any."""
+        return [GraphMLHandle(content, name, index, id, nodes, edges)
+                for index, (id, nodes, edges) in enumerate(cls._count_graphml(content))]
 
+    @classmethod
+    def load(cls, content, name="unknown", args=None):
+        """Load the graphs in content, or only graph number args.graph (counting from 0) if set."""
+        select = getattr(args, 'graph', None)
+        if select is None:
+            return cls._load_graphml(source=name, fmt=os.path.basename(__file__), content=content)
+
+        g = cls._load_graphml(source=name, fmt=os.path.basename(__file__), content=content, select={select})
+        if len(g) == 0:
+            raise Exception("There is no graph %d in %s"%(select, name))
         return g
+
+class GraphMLHandle:
+    """A graph in a graphml document that has been counted but not loaded.
+
+    index is the position of the graph among the top-level graphs of the
+    document, id its id attribute (or None), and nodes and edges the number
+    of node and edge elements in it.  load() parses the document up to the
+    end of the graph and returns it as a GeometricGraph.
+    """
+
+    def __init__(self, content, source, index, id, nodes, edges):
+        self.content = content
+        self.source = source
+        self.index = index
+        self.id = id
+        self.nodes = nodes
+        self.edges = edges
+
+    def load(self):
+        return GraphMLLoader._load_graphml(source=self.source, fmt=os.path.basename(__file__), content=self.content, select={self.index})[0]
+
+    def __repr__(self):
+        return "GraphMLHandle(%s, index=%d, id=%r, nodes=%d, edges=%d)"%(self.source, self.index, self.id, self.nodes, self.edges)
@@ -29,11 +29,12 @@ if __name__ == '__main__' and __package__ is None:
     __LEVEL = 2
     os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
 
-from ORD53.graph.Graph import GeometricGraph
-from ORD53.common.geometry import Vertex2
-from ORD53.common.iter import pair_iterator, PeekIterator
+from ORD53.graph.Graph import ColumnarGeometricGraph
+from ORD53.common.geometry import AffineTransform, sample_arc
+from ORD53.common.content import as_file
 
-import xml.etree.ElementTree as ET
+from lxml import etree as ET
+import numpy as np
 import os
 import sys
 
@@ -41,179 +42,166 @@ class IpeLoader:
     """Load a graph from an IPE file"""
     extension = '.ipe'
 
-    @staticmethod
-    def _transform(x, y, matrix):
-        """Transform a point (x,y) as defined by matrix."""
-        if matrix is None:
-            return x, y
-
-        if len(matrix) != 6:
-            raise("Invalid matrix '%s'."%(matrix))
-
-        x, y = x*matrix[0] + y*matrix[2], x*matrix[1] + y*matrix[3]
-
-        x += matrix[4]
-        y += matrix[5]
-        return x, y
+    ARC_TOLERANCE = 0.1
+    """How far, in drawing units, segments approximating arcs may stray from them by default."""
 
     @staticmethod
-    def _sample_arc(g, center, r, v0, v1):
-        mx = center[0]
-        my = center[1]
-
-        vec0x = -mx + v0.x
-        vec0y = -my + v0.y
-
-        vec1x = -mx + v1.x
-        vec1y = -my + v1.y
-
-        sp = vec0x*vec1x + vec0y*vec1y
-        l0 = math.sqrt(vec0x*vec0x + vec0y*vec0y)
-        l1 = math.sqrt(vec1x*vec1x + vec1y*vec1y)
-
-        angle = math.acos( sp / (l0*l1) )
-
-        samplepoints = [ v0 ]
-        samples = 32
-        for i in xrange(1, samples):
-            d = angle * (float(i)/samples)
-            vx = vec0x * math.cos(d) - vec0y * math.sin(d);
-            vy = vec0x * math.sin(d) + vec0y * math.cos(d);
-
-            x = mx + vx
-            y = my + vy
-
-            samplepoints.append( Vertex2(x, y) )
-
-        samplepoints.append( v1 )
-
-        for t in pair_iterator(samplepoints):
-            g.add_edge_by_vertex(*t)
-
-    @staticmethod
-    def _add_path(g, t, matrix = None, speed = None, wa = None):
-        """Add a single path object"""
-        lines = []
-        for l in t.split("\n"):
-            if l == "": continue
-            lines.append(l)
-
-        if len(lines) < 2:
-            raise Exception("less than two lines in path block")
-
-        line = lines.pop(0)
-        f = line.split()
-        if f[2] != "m":
-            raise Exception("first line of text did not start with an m element: "+line)
-        x, y = float(f[0]), float(f[1])
-        x, y = IpeLoader._transform(x, y, matrix)
-        v0 = Vertex2(x, y)
-        first = v0
-
-        while len(lines) > 0:
-            line = lines.pop(0)
-            if line == "h":
-                if (len(lines) != 0):
-                    raise Exception("Found 'h' in path but not at the end.   Confused.")
-                v1 = first
-                pathtype = 'l'
+    def _parse_path(text, matrix = None, arc_tolerance = ARC_TOLERANCE):
+        """Parse the text of a single path object.
+
+        The text is tokenized in a single pass and all its points are
+        transformed by matrix at once.  Arcs are replaced by segments that
+        stay within arc_tolerance of them after the transformation.  Returns
+        the (n, 2) array of points and the (k, 2) array of segments, as pairs
+        of indices into the points, in the order they are drawn.
+        """
+        if matrix is not None and len(matrix) != 6:
+            raise Exception("Invalid matrix '%s'."%(matrix,))
+        if matrix is not None:
+            # arcs are sampled before the matrix is applied, which stretches them by up to this much
+            stretch = np.linalg.norm(((matrix[0], matrix[2]), (matrix[1], matrix[3])), 2)
+            if stretch > 0:
+                arc_tolerance = arc_tolerance / stretch
+
+        points = []
+        segments = []
+        operands = []
+        first = current = None
+        closed = False
+        elements = 0
+        for token in text.split():
+            if not token.isalpha():
+                operands.append(float(token))
+                continue
+            if closed:
+                raise Exception("Found 'h' in path but not at the end.   Confused.")
+            if first is None and token != "m":
+                raise Exception("path did not start with an m element: "+token)
+            elements += 1
+
+            if token == "m" or token == "l":
+                if len(operands) != 2:
+                    raise Exception("Expected 2 coordinates for '%s' in path, got %d."%(token, len(operands)))
+                points.append(operands)
+                if token == "l":
+                    segments.append((current, len(points)-1))
+                elif first is None:
+                    first = len(points)-1
+                current = len(points)-1
+            elif token == "h":
+                segments.append((current, first))
+                closed = True
+            elif token == "a":
+                if len(operands) != 8:
+                    raise Exception("Expected 8 numbers for 'a' in path, got %d."%(len(operands),))
+                samples = sample_arc(operands[:6], points[current], operands[6:], arc_tolerance)
+                chain = [current] + list(range(len(points), len(points) + len(samples) + 1))
+                points.extend(samples.tolist())
+                points.append(operands[6:])
+                segments.extend(zip(chain, chain[1:]))
+                current = len(points)-1
             else:
-                f = line.split()
-                x, y = float(f[0]), float(f[1])
-                x, y = IpeLoader._transform(x, y, matrix)
-                pathtype = f[-1]
-                if pathtype == "l" or pathtype =="m":
-                    v1 = Vertex2(x, y)
-
-            if pathtype == "l":
-                e = { "vertex0": v0, "vertex1": v1 }
-                if speed is not None:
-                    e['w'] = speed
-                if wa is not None:
-                    e['wa'] = wa
-                g.add_edge_by_vertex(**e)
-                v0 = v1
-            elif pathtype == "m": # starting a new chain
-                v0 = v1
-            elif pathtype == "a":
-                if matrix is not None:
-                    raise Exception("Cannot handle matrix transformed arcs yet")
-                if len(lines) > 0:
-                    raise Exception("More lines after arc in line block?")
-                if f[0] != f[3] or f[1] != '0' or f[2] != '0':
-                    raise Exception("Arc not a circle? " + ' '.join(f))
-
-                center = (float(f[4]), float(f[5]))
-                r = f[0];
-                v1 = Vertex2(float(f[6]), float(f[7]))
-                IpeLoader._sample_arc(g, center, r, v0, v1)
-            else:
-                raise Exception("Unknown element in second line of text: "+line)
+                raise Exception("Unknown element in path: "+token)
+            operands = []
 
+        if operands:
+            raise Exception("Trailing coordinates in path.")
+        if elements < 2:
+            raise Exception("less than two elements in path block")
 
+        points = np.array(points, dtype=np.float64)
+        if matrix is not None:
+            points = AffineTransform().transformed(*matrix).apply(points)
+        return points, np.array(segments, dtype=np.int64).reshape(-1, 2)
 
+    @staticmethod
+    def _add_paths(g, paths):
+        """Add parsed paths, given as (points, segments, speed), to g in bulk.
+
+        Vertices get their indices in the order in which they are first drawn,
+        just like adding the segments one by one would.
+        """
+        paths = [p for p in paths if len(p[1]) > 0]
+        if not paths:
+            return
+        ends = np.concatenate([points[segments].reshape(-1, 2) for points, segments, _ in paths])
+        idx = g.add_vertices(ends)
+
+        w = None
+        if any(speed is not None for _, _, speed in paths):
+            w = np.concatenate([np.full(len(segments), np.nan if speed is None else speed) for _, segments, speed in paths])
+        g.add_edges_by_index(idx.reshape(-1, 2), w=w, ignore_loops=True)
 
     @classmethod
     def load(cls, content, name="unknown", args=None):
-        """Load graph from a valid .line file"""
+        """Load graph from a valid .ipe file"""
         flatten = args is not None and args.flatten
+        arc_tolerance = cls.ARC_TOLERANCE
+        if args is not None and args.arc_tolerance is not None:
+            arc_tolerance = args.arc_tolerance
+        fmt = os.path.basename(__file__)
 
-        root = ET.fromstring(content)
-        graph = GeometricGraph(name, fmt=os.path.basename(__file__)) if flatten else None
+        # each graph along with the paths, parsed once, that are drawn in it
         graphs = []
+        if flatten:
+            graphs.append((ColumnarGeometricGraph(source=name, fmt=fmt), []))
 
-        for child in root:
-            if child.tag != "page": continue
-            page = child
-
-            if not flatten:
-                layer_visible_in_views = {}
-                for v in page.findall("./view"):
-                    g = GeometricGraph(source="%s (view %d)"%(name, len(graphs)+1), fmt=os.path.basename(__file__))
-                    graphs.append(g)
-                    if 'layers' not in v.attrib: continue
-
-                    for l in v.attrib['layers'].split():
-                        if not l in layer_visible_in_views:
-                            layer_visible_in_views[l] = []
-                        layer_visible_in_views[l].append(g)
-
-            active_layer = None
-            for child in page:
-                if 'layer' in child.attrib:
-                    active_layer = child.attrib['layer']
-                if child.tag != 'path': continue
-
-                t =  child.text
-                m = list(map(lambda a: float(a), child.attrib['matrix'].split())) if 'matrix' in child.attrib else None
-                speed = None
-                if 'pen' in child.attrib:
-                    try:
-                        speed = float(child.attrib['pen'])
-                    except ValueError as e:
-                        print("Warning: Cannot interpret", child.attrib['pen'], "as weight number; Ignoring.", file=sys.stderr)
-
-                #if 'stroke' in child.attrib:
-                #    s = child.attrib['stroke'].split(' ', 2)
-                #    if len(s) == 3:
-                #        blue = float(s[2])
-                #        speed = (0.502 * 2)/(1-blue) - 1
-                if active_layer is None:
-                    raise Exception("No active layer.")
+        with as_file(content) as f:
+            for _, page in ET.iterparse(f, events=('end',), tag='page', huge_tree=True):
                 if flatten:
-                    cls._add_path(graph, t, m, speed=speed)
+                    layer_visible_in_views = None
                 else:
-                    if not active_layer in layer_visible_in_views:
-                        continue
-                    assert(isinstance(layer_visible_in_views[active_layer], list))
-                    for g in layer_visible_in_views[active_layer]:
-                        assert(isinstance(g, GeometricGraph))
-                        cls._add_path(g, t, m, speed=speed)
-
+                    layer_visible_in_views = {}
+                    for v in page.findall("./view"):
+                        g = ColumnarGeometricGraph(source="%s (view %d)"%(name, len(graphs)+1), fmt=fmt)
+                        paths = []
+                        graphs.append((g, paths))
+                        if 'layers' not in v.attrib: continue
+
+                        for l in v.attrib['layers'].split():
+                            layer_visible_in_views.setdefault(l, []).append(paths)
+
+                active_layer = None
+                for child in page:
+                    if 'layer' in child.attrib:
+                        active_layer = child.attrib['layer']
+                    if child.tag != 'path': continue
+
+                    m = list(map(lambda a: float(a), child.attrib['matrix'].split())) if 'matrix' in child.attrib else None
+                    speed = None
+                    if 'pen' in child.attrib:
+                        try:
+                            speed = float(child.attrib['pen'])
+                        except ValueError as e:
+                            print("Warning: Cannot interpret", child.attrib['pen'], "as weight number; Ignoring.", file=sys.stderr)
+
+                    #if 'stroke' in child.attrib:
+                    #    s = child.attrib['stroke'].split(' ', 2)
+                    #    if len(s) == 3:
+                    #        blue = float(s[2])
+                    #        speed = (0.502 * 2)/(1-blue) - 1
+                    if active_layer is None:
+                        raise Exception("No active layer.")
+                    if flatten:
+                        visible_in = [graphs[0][1]]
+                    else:
+                        visible_in = layer_visible_in_views.get(active_layer)
+                        if not visible_in:
+                            continue
+                    path = cls._parse_path(child.text or "", m, arc_tolerance) + (speed,)
+                    for paths in visible_in:
+                        paths.append(path)
+
+                page.clear()
+                while page.getprevious() is not None:
+                    del page.getparent()[0]
+
+        for g, paths in graphs:
+            cls._add_paths(g, paths)
         if flatten:
-            return graph
+            return graphs[0][0]
         else:
-            return graphs
+            return [g for g, _ in graphs]
 
 def main():
     """Load a graph from stdin or a file."""
@@ -225,10 +213,11 @@ def main():
     parser.add_argument('outputfile', help='Outputfile (.graphml)', nargs='?', type=argparse.FileType('wb'), default=sys.stdout.buffer)
     parser.add_argument('-r', '--randomize-weights', action='store_true', default=False, help='randomize edge weights')
     parser.add_argument('-f', '--flatten', action='store_true', default=False, help='flatten views and pages')
+    parser.add_argument('--arc-tolerance', metavar='TOL', type=float, default=None, help='how far segments replacing arcs may stray from them (default: %s)'%(IpeLoader.ARC_TOLERANCE,))
 
     args = parser.parse_args()
 
-    g = IpeLoader.load(args.inputfile.read())
+    g = IpeLoader.load(args.inputfile.read(), args=args)
     if not isinstance(g, list):
         g = [g]
     if args.randomize_weights:
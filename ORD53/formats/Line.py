@@ -29,10 +29,13 @@ if __name__ == '__main__' and __package__ is None:
     __LEVEL = 2
     os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
 
-from ORD53.graph.Graph import GeometricGraph
+from ORD53.graph.Graph import GeometricGraph, ColumnarGeometricGraph
 from ORD53.common.geometry import Vertex2
 from ORD53.common.iter import pair_iterator, PeekIterator
+from ORD53.common.parse import parse_blocks, jobs_from_args
+from ORD53.common.content import as_text
 
+import numpy as np
 import os
 
 class LineLoader:
@@ -55,11 +58,51 @@ class LineLoader:
             g.add_edge_by_vertex( vertices[-1],vertices[0] )
 
 
+    @staticmethod
+    def _parse_blocks(content, jobs=1):
+        """Parse all count-prefixed coordinate blocks at once.
+
+        Returns the (n, 2) array of all coordinates and the array of block
+        lengths, or None if content is not a well formed file in which every
+        block has at least two vertices.  The element-wise loader then gets to
+        deal with (and complain about) it.
+        """
+        try:
+            coordinates, lengths = parse_blocks(content, jobs)
+        except ValueError:
+            return None
+        if (lengths < 2).any():
+            return None
+        return coordinates, lengths
+
+    @staticmethod
+    def _add_polychains(g, coordinates, lengths, close = False):
+        """Add polychains of the given lengths, made of consecutive rows of coordinates, in bulk."""
+        idx = g.add_vertices(coordinates)
+
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+        src = np.arange(len(coordinates))
+        dst = src + 1
+        if close:
+            dst[ends - 1] = starts
+        else:
+            keep = np.ones(len(src), dtype=bool)
+            keep[ends - 1] = False
+            src, dst = src[keep], dst[keep]
+        g.add_edges_by_index(np.stack((idx[src], idx[dst]), axis=1), ignore_loops=True)
+
     @classmethod
-    def load(cls, content, name="unknown", args=None):
-        """Load graph from a valid .line file"""
-        g = GeometricGraph(source=name, fmt=os.path.basename(__file__))
-        f = PeekIterator(content.splitlines())
+    def _load(cls, content, name, fmt, close = False, jobs = 1):
+        """Load graph from a valid .line (or, if close is set, .poly) file"""
+        blocks = cls._parse_blocks(content, jobs)
+        if blocks is not None:
+            g = ColumnarGeometricGraph(source=name, fmt=fmt)
+            cls._add_polychains(g, *blocks, close=close)
+            return g
+
+        g = GeometricGraph(source=name, fmt=fmt)
+        f = PeekIterator(as_text(content).splitlines())
         while True:
             try:
                 if f.peek() == "":
@@ -67,9 +110,14 @@ class LineLoader:
                     continue
             except StopIteration:
                 break
-            cls._add_polychain(g, f)
+            cls._add_polychain(g, f, close)
         return g
 
+    @classmethod
+    def load(cls, content, name="unknown", args=None):
+        """Load graph from a valid .line file"""
+        return cls._load(content, name, os.path.basename(__file__), jobs=jobs_from_args(args))
+
 def main():
     """Load a graph from stdin or a file."""
     import argparse
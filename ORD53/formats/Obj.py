@@ -30,10 +30,10 @@ if __name__ == '__main__' and __package__ is None:
     __LEVEL = 2
     os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
 
-from ORD53.graph.Graph import GeometricGraph
-from ORD53.common.geometry import Vertex3
-from ORD53.common.iter import pair_iterator, cyclic_pair_iterator, PeekIterator
+from ORD53.graph.Graph import ColumnarGeometricGraph
+from ORD53.common.content import as_text
 
+import numpy as np
 import os
 
 class ObjLoader:
@@ -41,47 +41,63 @@ class ObjLoader:
 
     """Load a graph from a Wavefront OBJ format"""
     @staticmethod
-    def _add_vertex(g, f):
-        """Add a single vertex from the file"""
-        (v, x, y, z) = [c for c in next(f).split()]
-        g.add_vertex(Vertex3(float(x), float(y), float(z)))
+    def _vertex_refs(fields, nv, line):
+        """Return the 1-based vertex indices of a face or chain.
+
+        Fields may be v/vt/vn triplets, of which only v counts.  Negative
+        indices count back from the last of the nv vertices read so far.
+        """
+        if '/' in line:
+            refs = [int(f.partition('/')[0]) for f in fields]
+        else:
+            refs = list(map(int, fields))
+        if len(refs) < 2:
+            raise Exception("Need at least two vertices in line: "+line)
+        if min(refs) < 0:
+            refs = [r if r > 0 else nv + r + 1 for r in refs]
+        return refs
 
-    @staticmethod
-    def _add_face(g, f):
-        """Add a single face from the file"""
-        temp = next(f).split()
-        temp.pop(0)
-        face_list = [int(c)-1 for c in temp]
-        for e in cyclic_pair_iterator(face_list):
-            g.add_edge_by_index(*e, ignore_dups=True)
-
-    @staticmethod
-    def _add_chain(g, f):
-        """Add a single chain from the file"""
-        temp = next(f).split()
-        temp.pop(0)
-        chain_list = [int(c)-1 for c in temp]
-        for e in pair_iterator(chain_list):
-            g.add_edge_by_index(*e, ignore_dups=True)
+    @classmethod
+    def _parse(cls, text):
+        """Read the vertices, faces and chains of an .obj file in a single pass.
+
+        Returns the (n, 3) array of vertex coordinates and the (k, 2) array of
+        edges, as 0-based indices into the coordinates, in file order.
+        """
+        coordinates = []
+        src = []
+        dst = []
+        for line in text.splitlines():
+            fields = line.split()
+            if not fields:
+                continue
+            kind = fields[0]
+            if kind == "v":
+                if len(fields) < 4:
+                    raise Exception("Need three coordinates in line: "+line)
+                coordinates.append((float(fields[1]), float(fields[2]), float(fields[3])))
+            elif kind == "f":
+                refs = cls._vertex_refs(fields[1:], len(coordinates), line)
+                src.extend(refs)
+                dst.extend(refs[1:])
+                dst.append(refs[0])
+            elif kind == "l":
+                refs = cls._vertex_refs(fields[1:], len(coordinates), line)
+                src.extend(refs[:-1])
+                dst.extend(refs[1:])
+
+        edges = np.stack((np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64)), axis=1) - 1
+        if len(edges) > 0 and (edges.min() < 0 or edges.max() >= len(coordinates)):
+            raise Exception("Reference to unknown vertex.")
+        return np.array(coordinates, dtype=np.float64).reshape(-1, 3), edges
 
     @classmethod
     def load(cls, content, name="unknown", args=None):
         """Load graph from a valid .obj file"""
-        g = GeometricGraph(source=name, fmt=os.path.basename(__file__))
-        f = PeekIterator(content.splitlines())
-        while True:
-            try:
-                if f.peek().startswith("v"):
-                    cls._add_vertex(g, f)
-                elif f.peek().startswith("f"):
-                    cls._add_face(g, f)
-                elif f.peek().startswith("l"):
-                    cls._add_chain(g, f)
-                else:
-                    next(f)
-
-            except StopIteration:
-                break
+        coordinates, edges = cls._parse(as_text(content))
+        g = ColumnarGeometricGraph(source=name, fmt=os.path.basename(__file__), dim=3)
+        idx = g.add_vertices(coordinates)
+        g.add_edges_by_index(idx[edges], ignore_dups=True, ignore_loops=True)
         return g
 
 def main():
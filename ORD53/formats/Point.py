@@ -29,9 +29,11 @@ if __name__ == '__main__' and __package__ is None:
     __LEVEL = 2
     os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
 
-from ORD53.graph.Graph import GeometricGraph
+from ORD53.graph.Graph import GeometricGraph, ColumnarGeometricGraph
 from ORD53.common.geometry import Vertex2
 from ORD53.common.iter import PeekIterator
+from ORD53.common.parse import parse_blocks, jobs_from_args
+from ORD53.common.content import as_text
 
 import os
 
@@ -51,8 +53,17 @@ class PointLoader:
     @classmethod
     def load(cls, content, name="unknown", args=None):
         """Load graph from a valid .pnt file"""
+        try:
+            coordinates, _ = parse_blocks(content, jobs_from_args(args))
+        except ValueError:
+            pass # let the element-wise loader complain about it
+        else:
+            g = ColumnarGeometricGraph(source=name, fmt=os.path.basename(__file__))
+            g.add_vertices(coordinates)
+            return g
+
         g = GeometricGraph(source=name, fmt=os.path.basename(__file__))
-        f = PeekIterator(content.splitlines())
+        f = PeekIterator(as_text(content).splitlines())
         while True:
             try:
                 if f.peek() == "":
@@ -35,6 +35,7 @@ from ORD53.common.geometry import Vertex2
 from ORD53.common.iter import pair_iterator, PeekIterator
 
 from ORD53.formats.Line import LineLoader
+from ORD53.common.parse import jobs_from_args
 
 import os
 
@@ -44,18 +45,7 @@ class PolyLoader:
     @classmethod
     def load(cls, content, name="unknown", args=None):
         """Load graph from a valid .line file"""
-        g = GeometricGraph(source=name, fmt=os.path.basename(__file__))
-        f = PeekIterator(content.splitlines())
-        while True:
-            try:
-                if f.peek() == "":
-                    next(f)
-                    continue
-            except StopIteration:
-                break
-            LineLoader._add_polychain(g, f, True)
-            
-        return g
+        return LineLoader._load(content, name, os.path.basename(__file__), close=True, jobs=jobs_from_args(args))
 
 def main():
     """Load a graph from stdin or a file."""
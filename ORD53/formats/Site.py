@@ -29,29 +29,100 @@ if __name__ == '__main__' and __package__ is None:
     __LEVEL = 2
     os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
 
-from ORD53.graph.Graph import GeometricGraph
-from ORD53.common.geometry import Vertex2
-from ORD53.common.iter import pair_iterator, PeekIterator
+from ORD53.graph.Graph import ColumnarGeometricGraph, GraphException
+from ORD53.common.geometry import sample_circular_arcs
+from ORD53.common.parse import count_tokens_per_line, parse_floats
+from ORD53.common.content import as_text
 
+import numpy as np
 import os
 
 class SiteLoader:
     extension = '.site'
 
+    SEGMENT = 0
+    POINT = 2
+    ARC_CCW = 1
+    ARC_CW = -1
+    FIELDS = { SEGMENT: 4, POINT: 2, ARC_CCW: 6, ARC_CW: 6 }
+    """The number of values in the data line of each element type."""
+
+    ARC_TOLERANCE = 1e-4
+    """How far segments approximating arcs may stray from them by default."""
+
+    @classmethod
+    def _parse(cls, text):
+        """Split a .site file into its element types and, per type, the (n, fields) array of their data."""
+        lines = [l for l in text.splitlines() if l.strip()]
+        if len(lines) % 2 != 0:
+            raise Exception("Site element without a data line.")
+        types = parse_floats("\n".join(lines[0::2]))
+        if len(types) != len(lines) // 2 or (types != np.round(types)).any():
+            raise Exception("Invalid site element type line.")
+        types = types.astype(np.int64)
+
+        unknown = ~np.isin(types, list(cls.FIELDS))
+        if unknown.any():
+            raise Exception("Unknown site element type %d."%(types[unknown][0],))
+
+        # the values are parsed per type below, so a data line with too few
+        # values followed by one with too many would otherwise go unnoticed.
+        fields = np.zeros(len(types), dtype=np.int64)
+        for t, n in cls.FIELDS.items():
+            fields[types == t] = n
+        counts = count_tokens_per_line("\n".join(lines[1::2]))
+        if len(counts) != len(types) or (counts != fields).any():
+            bad = np.flatnonzero(counts != fields)[0] if len(counts) == len(types) else len(counts)
+            raise GraphException("Site element %d of type %d needs %d values."%(bad, types[bad], fields[bad]))
+
+        data_lines = lines[1::2]
+        data = {}
+        for t, fields in cls.FIELDS.items():
+            which = np.flatnonzero(types == t)
+            values = parse_floats("\n".join([data_lines[i] for i in which]))
+            if len(values) != fields*len(which):
+                raise Exception("Expected %d values for each site element of type %d."%(fields, t))
+            data[t] = values.reshape(-1, fields)
+        return types, data
+
     @classmethod
     def load(cls, content, name="unknown", args=None):
         """Load graph from a valid .site file"""
-        g = GeometricGraph(source=name, fmt=os.path.basename(__file__))
-        f = iter(content.splitlines())
-        while True:
-            try:
-                element_type = next(f).rstrip()
-                element_data = next(f).rstrip()
-                if element_type == "0": # segment
-                    c = [float(e) for e in element_data.split()]
-                    g.add_edge_by_vertex(Vertex2(c[0], c[1]), Vertex2(c[2], c[3]))
-            except StopIteration:
-                break
+        arc_tolerance = cls.ARC_TOLERANCE
+        if args is not None and args.arc_tolerance is not None:
+            arc_tolerance = args.arc_tolerance
+        types, data = cls._parse(as_text(content))
+
+        # every element becomes a run of vertices in file order, joined by
+        # edges unless it is a point: segments and points take their given
+        # coordinates, arcs their start, the sampled points and their end.
+        arc_order = np.concatenate((np.flatnonzero(types == cls.ARC_CCW), np.flatnonzero(types == cls.ARC_CW)))
+        arcs = np.concatenate((data[cls.ARC_CCW], data[cls.ARC_CW]))
+        clockwise = types[arc_order] == cls.ARC_CW
+        samples, counts = sample_circular_arcs(arcs[:, 0:2], arcs[:, 2:4], arcs[:, 4:6], clockwise, arc_tolerance)
+
+        lengths = np.where(types == cls.POINT, 1, 2)
+        lengths[arc_order] += counts
+        ends = np.cumsum(lengths)
+        starts = ends - lengths
+
+        coordinates = np.empty((ends[-1] if len(ends) > 0 else 0, 2))
+        segments = types == cls.SEGMENT
+        coordinates[starts[segments]] = data[cls.SEGMENT][:, 0:2]
+        coordinates[starts[segments] + 1] = data[cls.SEGMENT][:, 2:4]
+        coordinates[starts[types == cls.POINT]] = data[cls.POINT]
+        coordinates[starts[arc_order]] = arcs[:, 0:2]
+        coordinates[ends[arc_order] - 1] = arcs[:, 2:4]
+        offset_in_arc = np.arange(len(samples)) - np.repeat(np.cumsum(counts) - counts, counts)
+        coordinates[np.repeat(starts[arc_order] + 1, counts) + offset_in_arc] = samples
+
+        joined = np.ones(len(coordinates), dtype=bool)
+        joined[ends - 1] = False
+        src = np.flatnonzero(joined)
+
+        g = ColumnarGeometricGraph(source=name, fmt=os.path.basename(__file__))
+        idx = g.add_vertices(coordinates)
+        g.add_edges_by_index(np.stack((idx[src], idx[src + 1]), axis=1), ignore_loops=True)
         return g
 
 def main():
@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+# Copyright (c) 2018, 2019 Peter Palfrader
+#
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+#
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+
+"""Guess the format of a graph file from its first few KB."""
+
+from ORD53.graph.Graph import GeometricGraph
+
+import re
+
+SNIFF_SIZE = 8192
+
+# formats sniff_extension() recognizes for sure; the others are guesses
+CERTAIN_EXTENSIONS = frozenset(('.graphml', '.ipe', '.obj', '.ordg'))
+
+OBJ_KEYWORDS = frozenset(('v', 'vt', 'vn', 'vp', 'f', 'l', 'p', 'o', 'g', 's', 'mtllib', 'usemtl'))
+
+_XML_ROOT = re.compile(rb'\s*<(?:[A-Za-z_][\w.\-]*:)?([A-Za-z_][\w.\-]*)')
+_XML_SKIP = re.compile(rb'\s*(?:<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>\[]*(?:\[.*?\])?\s*>)', re.S)
+
+def _xml_root(head):
+    """Return the name of the root element if head starts an XML document.
+
+    >>> _xml_root(b'<?xml version="1.0"?>\\n<!DOCTYPE ipe SYSTEM "ipe.dtd">\\n<ipe version="70000">')
+    'ipe'
+    >>> _xml_root(b'<!-- x --><g:graphml xmlns:g="...">')
+    'graphml'
+    """
+    pos = 0
+    while True:
+        m = _XML_SKIP.match(head, pos)
+        if m is None or m.end() == pos:
+            break
+        pos = m.end()
+    m = _XML_ROOT.match(head, pos)
+    return m.group(1).decode() if m is not None else None
+
+def _is_int(token):
+    return re.fullmatch(rb'[+-]?\d+', token) is not None
+
+def _is_number(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+def _blocks_extension(lines):
+    """'.line' if lines look like count-prefixed coordinate blocks ('.pnt' if some block is too short for a chain), else None."""
+    i = 0
+    chains = True
+    while i < len(lines):
+        if len(lines[i]) != 1 or not _is_int(lines[i][0]) or int(lines[i][0]) < 0:
+            return None
+        n = int(lines[i][0])
+        if n < 2:
+            chains = False
+        for coordinates in lines[i+1:i+1+n]:
+            if len(coordinates) != 2 or not all(_is_number(c) for c in coordinates):
+                return None
+        i += 1 + n
+    return '.line' if chains else '.pnt'
+
+SITE_DATA_LENGTH = { b'0': 4, b'2': 2, b'1': 6, b'-1': 6 }
+
+def _sites_extension(lines):
+    """'.site' if lines look like type/data pairs of site elements, else None."""
+    if len(lines) < 2:
+        return None
+    for element_type, data in zip(lines[0::2], lines[1::2]):
+        if len(element_type) != 1 or element_type[0] not in SITE_DATA_LENGTH:
+            return None
+        if len(data) != SITE_DATA_LENGTH[element_type[0]] or not all(_is_number(c) for c in data):
+            return None
+    return '.site'
+
+def sniff_extension(content):
+    """Guess the format of content (str, bytes or mmap) from its beginning.
+
+    Returns the extension of the matching loader, or None if there is no
+    clear match.  The count-prefixed formats cannot be told apart in
+    general; they are reported as '.line', or '.pnt' if some block holds
+    fewer than two vertices.  Only extensions in CERTAIN_EXTENSIONS are
+    more than a guess.
+
+    >>> sniff_extension(b'<?xml version="1.0"?>\\n<graphml xmlns="http://graphml.graphdrawing.org/xmlns">')
+    '.graphml'
+    >>> sniff_extension("# made by hand\\nv 0 0 0\\nv 1 0 0\\nl 1 2\\n")
+    '.obj'
+    >>> sniff_extension(b"3\\n0 0\\n1 0\\n1 1\\n\\n2\\n5 5\\n6 6\\n")
+    '.line'
+    >>> sniff_extension(b"1\\n0 0\\n\\n2\\n5 5\\n6 6\\n")
+    '.pnt'
+    >>> sniff_extension(b"2\\n3 3\\n0\\n1 1 0 0\\n")
+    '.site'
+    >>> sniff_extension(b"ORD53BG\\0\\1\\0\\2\\0")
+    '.ordg'
+    >>> sniff_extension(b"hello world\\n") is None
+    True
+    """
+    head = content[:SNIFF_SIZE]
+    if isinstance(head, str):
+        head = head.encode()
+    head = bytes(head)
+    if head.startswith(GeometricGraph.BINARY_MAGIC):
+        return '.ordg'
+    if head.startswith(b'\xef\xbb\xbf'):
+        head = head[3:]
+
+    stripped = head.lstrip()
+    if stripped.startswith(b'<'):
+        root = _xml_root(stripped)
+        if root in ('graphml', 'ipe'):
+            return '.' + root
+        return None
+
+    if len(content) > SNIFF_SIZE:
+        # the last line might be cut off
+        head = head[:head.rfind(b'\n') + 1]
+    lines = [l.split() for l in head.splitlines()]
+    lines = [l for l in lines if l]
+    if not lines:
+        return None
+
+    first = lines[0][0]
+    if first.startswith(b'#') or first.decode(errors='replace') in OBJ_KEYWORDS:
+        return '.obj'
+
+    return _blocks_extension(lines) or _sites_extension(lines)
@@ -30,20 +30,38 @@ if __name__ == '__main__' and __package__ is None:
     os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
 
 from lxml import etree as ET
-from ORD53.common.IndexedSet import IndexedSet
-from ORD53.common.geometry import Vertex2, Vertex3
+from ORD53.common.IndexedSet import IndexedSet, SnappingIndexedSet
+from ORD53.common.EdgeStore import EdgeStore
+from ORD53.common.geometry import Vertex2, Vertex3, AffineTransform
+import itertools
+import numpy as np
 import os
-import random
+import struct
 import sys
 
 class GraphException(Exception):
     """Exception raised by classes in this module."""
     pass
 
+def _xml_text(value):
+    """Return value as a string, escaped for use as XML character data like lxml does."""
+    s = str(value)
+    if '&' in s or '<' in s or '>' in s or '\r' in s:
+        s = s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('\r', '&#13;')
+    return s
+
+def _write_chunk(f, chunk):
+    """Write and empty a list of strings, encoded as ASCII with character references like lxml does."""
+    f.write(''.join(chunk).encode('ascii', 'xmlcharrefreplace'))
+    chunk.clear()
+
 class GeometricGraph:
     """A geometric graph.
 
     This is a graph where vertices have (2d) coordinates.
+
+    With snap set, a vertex added within distance snap of an existing one is
+    merged into it, see SnappingIndexedSet.
     """
 
     GRAPHML_NAMESPACE = 'http://graphml.graphdrawing.org/xmlns'
@@ -53,12 +71,29 @@ class GeometricGraph:
     DEFAULT_W = str(1.0)
     DEFAULT_WA = str(0.0)
 
-    def __init__(self, source="unknown", fmt=None):
-        self.vertices = IndexedSet()
-        self.edges = {}
+    WRITE_CHUNK = 65536 # number of lines the writers buffer
+
+    # Binary graph format, all little endian: this header, followed by the
+    # V*dim float64 coordinates, the E*2 uint32 vertex indices of the edges
+    # (smaller index first), and then, if flagged, the E float64 weights and
+    # the E float64 additive weights, NaN meaning unset.
+    BINARY_MAGIC = b'ORD53BG\0'
+    BINARY_VERSION = 1
+    BINARY_HEADER = struct.Struct('<8sHBBIQQ') # magic, version, dim, flags, reserved, V, E
+    BINARY_FLAG_W = 0x01
+    BINARY_FLAG_WA = 0x02
+    BINARY_FLAG_W_INTEGRAL = 0x04 # whole weights are written without fraction
+
+    def __init__(self, source="unknown", fmt=None, snap=None):
+        self.snap = snap
+        self.vertices = self._new_vertex_set()
+        self.edges = EdgeStore()
         self.source = source
         self.fmt = fmt
 
+    def _new_vertex_set(self):
+        return IndexedSet() if self.snap is None else SnappingIndexedSet(self.snap)
+
     def add_vertex(self, vertex):
         """Add a vertex (instance of Vertex2 or Vertex3) to this graph."""
         assert isinstance(vertex, (Vertex2, Vertex3))
@@ -69,13 +104,13 @@ class GeometricGraph:
         assert isinstance(idx0, int)
         assert isinstance(idx1, int)
 
-        edge = tuple(sorted((idx0, idx1)))
-        if edge in self.edges and not ignore_dups:
-            raise GraphException("Edge already exists.")
-        self.edges[edge] = {
-            'w': w,
-            'wa': wa
-        }
+        if not self.edges.add(idx0, idx1, w, wa):
+            if not ignore_dups:
+                raise GraphException("Edge already exists.")
+            self.edges[(idx0, idx1)] = {
+                'w': w,
+                'wa': wa
+            }
 
     def add_edge_by_vertex(self, vertex0, vertex1, w=None, wa=None):
         """Add an edge given by 2 vertices (instance of Vertex2) to this graph.
@@ -88,38 +123,92 @@ class GeometricGraph:
         idx0 = self.add_vertex(vertex0)
         idx1 = self.add_vertex(vertex1)
 
-        edge = tuple(sorted((idx0, idx1)))
         if idx0 == idx1:
-            print("Ignoring loop edge", edge, file=sys.stderr)
+            print("Ignoring loop edge", (idx0, idx1), file=sys.stderr)
             return
-        if edge in self.edges:
+        if not self.edges.add(idx0, idx1, w, wa):
             raise GraphException("Edge already exists.")
-        self.edges[edge] = {
-            'w': w,
-            'wa': wa
-        }
 
     def __repr__(self):
         return "%s(%s, %s)"%(self.__class__.__name__, self.vertices, self.edges)
 
-    def randomize_weights(self, rnd_lower=0.20, rnd_upper=5.0, round_n=None):
-        for k, v in self.edges.items():
-            while True:
-              r = random.uniform(rnd_lower, rnd_upper);
-              if round_n == 0:
-                  r = round(r)  # So this gets turned into an integer, unlike when calling round(r,0)
-              elif round_n is not None:
-                  r = round(r, round_n)
-              if r != 0: break
-            v['w'] = str(r)
-
-    def transform_coordinates(self, scale=None):
-        if scale is not None:
-            new_v = IndexedSet()
-            for v in self.vertices:
-                assert isinstance(v, (Vertex2, Vertex3))
-                new_v.add( scale * v )
-            self.vertices = new_v
+    def randomize_weights(self, rnd_lower=0.20, rnd_upper=5.0, round_n=None, rng=None):
+        """Set the weight of every edge to a random, nonzero value between rnd_lower and rnd_upper.
+
+        Weights are rounded to round_n digits if given; with round_n 0 they
+        come out as integers.  rng is a numpy random Generator, or a seed
+        for one."""
+        weights = _random_weights(len(self.edges), rnd_lower, rnd_upper, round_n, rng)
+        if round_n == 0:
+            weights = weights.astype(np.int64)
+        self.edges.set_weights('w', map(str, weights.tolist()))
+
+    @property
+    def coordinates(self):
+        """A (V, dim) array of the vertex coordinates."""
+        vertices = list(self.vertices)
+        if len(vertices) > 0 and isinstance(vertices[0], Vertex3):
+            return np.array([(v.x, v.y, v.z) for v in vertices], dtype=np.float64).reshape(-1, 3)
+        return np.array([(v.x, v.y) for v in vertices], dtype=np.float64).reshape(-1, 2)
+
+    @staticmethod
+    def _combined_transform(scale, transform):
+        if scale is None:
+            return transform
+        scaling = AffineTransform().scaled(scale)
+        return scaling if transform is None else scaling.then(transform)
+
+    def transform_coordinates(self, scale=None, transform=None, on_collision='error'):
+        """Scale the vertex coordinates by scale, then apply the AffineTransform transform.
+
+        Should distinct vertices end up in the same place, a GraphException
+        is raised and the graph is left alone, unless on_collision is 'merge'.
+        Then they are merged like snap_vertices() does.  Returns the number
+        of vertices merged."""
+        if on_collision not in ('error', 'merge'):
+            raise ValueError("Invalid collision handling '%s'."%(on_collision,))
+        transform = self._combined_transform(scale, transform)
+        if transform is None:
+            return 0
+        coordinates = transform.apply(self.coordinates)
+        first, rank = _first_occurrences(coordinates)
+        merged = len(coordinates) - len(first)
+        if merged > 0 and on_collision == 'error':
+            raise GraphException("Transformation makes %d vertices coincide with others."%(merged,))
+        cls = Vertex3 if coordinates.shape[1] == 3 else Vertex2
+        vertices = [cls(*c) for c in coordinates[first].tolist()]
+        return merged + self._remap_vertices(vertices, rank)
+
+    def _remap_vertices(self, vertices, mapping):
+        """Replace the vertices by those in vertices, with vertex i becoming mapping[i].
+
+        The vertices are added to a new vertex set, so with snap set they may
+        be merged further; mapping is followed through to where they end up.
+        Edges follow their vertices.  Edges that become loops are dropped, and
+        of edges that end up joining the same vertices the first one is kept.
+        Returns the number of vertices merged while adding them."""
+        new_vertices = self._new_vertex_set()
+        added = np.array([new_vertices.add(v) for v in vertices], dtype=np.int64)
+        targets = added[np.asarray(mapping, dtype=np.int64)]
+
+        edges = EdgeStore()
+        src, dst = (targets[np.asarray(a, dtype=np.int64)].tolist() for a in self.edges.arrays())
+        for idx0, idx1, (_, _, w, wa) in zip(src, dst, self.edges.weighted()):
+            if idx0 != idx1:
+                edges.add(idx0, idx1, w, wa)
+
+        self.vertices = new_vertices
+        self.edges = edges
+        return len(added) - len(new_vertices)
+
+    def snap_vertices(self, eps):
+        """Merge vertices within distance eps of an earlier vertex into that one.
+
+        Edges follow their vertices, see _remap_vertices().  Returns the
+        number of vertices merged."""
+        snapped = SnappingIndexedSet(eps)
+        mapping = [snapped.add(v) for v in self.vertices]
+        return snapped.merged + self._remap_vertices(snapped, mapping)
 
     def get_nsmap(self):
         return {None : self.GRAPHML_NAMESPACE, 'xsi': self.XML_XSI}
@@ -127,8 +216,10 @@ class GeometricGraph:
     def get_tags(self):
         return {x: ET.QName(self.GRAPHML_NAMESPACE, x) for x in ('graphml', 'graph', 'node', 'edge', 'key', 'data', 'default')}
 
-    def get_as_graphml(self):
-        """Build a graphml XML document"""
+    def _get_graphml_skeleton(self):
+        """Build a graphml XML document with an empty graph element.
+
+        Returns the document root and the graph element."""
         nsmap = self.get_nsmap()
         tags = self.get_tags()
 
@@ -141,6 +232,19 @@ class GeometricGraph:
         ET.SubElement(key, tags['default']).text = self.DEFAULT_WA;
         graph = ET.SubElement(graphml, tags['graph'], {'edgedefault': 'undirected'})
 
+        commenttext = " Created by %s from %s "%(os.path.basename(sys.argv[0]), self.source)
+        commenttext = commenttext.replace('--', '- -')
+        if self.fmt is not None:
+            commenttext += " [%s]"%(self.fmt)
+        comment = ET.Comment(commenttext)
+        graphml.insert(0, comment)
+        return graphml, graph
+
+    def get_as_graphml(self):
+        """Build a graphml XML document"""
+        tags = self.get_tags()
+        graphml, graph = self._get_graphml_skeleton()
+
         for idx, v in enumerate(self.vertices):
             attrib = {'id': str(idx)}
             node = ET.Element(tags['node'], attrib)
@@ -158,21 +262,67 @@ class GeometricGraph:
                 ET.SubElement(edge, tags['data'], {'key': 'wa'}).text = attributes['wa']
             graph.append(edge)
 
-        commenttext = " Created by %s from %s "%(os.path.basename(sys.argv[0]), self.source)
-        commenttext = commenttext.replace('--', '- -')
-        if self.fmt is not None:
-            commenttext += " [%s]"%(self.fmt)
-        comment = ET.Comment(commenttext)
-        graphml.insert(0, comment)
         return graphml
 
+    def _graphml_node_texts(self):
+        """Yield the x and y texts of all vertices, XML escaped."""
+        for v in self.vertices:
+            yield _xml_text(v.x), _xml_text(v.y)
+
+    def _graphml_edge_texts(self):
+        """Yield source, target, and w and wa texts (XML escaped, or None) of all edges."""
+        for src, dst, w, wa in self.edges.weighted():
+            yield src, dst, (_xml_text(w) if w is not None else None), (_xml_text(wa) if wa is not None else None)
+
     def write_graphml(self, f):
-        """Write a graphml representation to the file f"""
-        xml = self.get_as_graphml()
-        for s in ET.tostringlist(xml, pretty_print=True):
-            f.write(s)
+        """Write a graphml representation to the file f
+
+        The output is the same as serializing get_as_graphml(), but nodes and
+        edges are formatted and written in chunks as we go rather than built
+        up as a tree first."""
+        graphml, _ = self._get_graphml_skeleton()
+        document = ET.tostring(graphml, pretty_print=True)
+        if len(self.vertices) == 0 and len(self.edges) == 0:
+            f.write(document)
+            return
+
+        head, sep, tail = document.partition(b'<graph edgedefault="undirected"/>\n')
+        assert sep
+        f.write(head)
+        f.write(b'<graph edgedefault="undirected">\n')
+
+        node = '    <node id="%d">\n      <data key="x">%s</data>\n      <data key="y">%s</data>\n    </node>\n'
+        chunk = []
+        for idx, (x, y) in enumerate(self._graphml_node_texts()):
+            chunk.append(node%(idx, x, y))
+            if len(chunk) >= self.WRITE_CHUNK:
+                _write_chunk(f, chunk)
+        for src, dst, w, wa in self._graphml_edge_texts():
+            if w is None and wa is None:
+                chunk.append('    <edge source="%d" target="%d"/>\n'%(src, dst))
+            else:
+                chunk.append('    <edge source="%d" target="%d">\n'%(src, dst))
+                if w is not None:
+                    chunk.append('      <data key="w">%s</data>\n'%(w,))
+                if wa is not None:
+                    chunk.append('      <data key="wa">%s</data>\n'%(wa,))
+                chunk.append('    </edge>\n')
+            if len(chunk) >= self.WRITE_CHUNK:
+                _write_chunk(f, chunk)
+        _write_chunk(f, chunk)
+
+        f.write(b'  </graph>\n')
+        f.write(tail)
+
+    def write_binary(self, f):
+        """Write the graph in binary format to the file f"""
+        ColumnarGeometricGraph.from_graph(self).write_binary(f)
 
     def write_ipe(self, f, markers=False):
+        """Write an ipe document with a path per edge to the file f
+
+        With markers, every vertex also gets a mark in a separate layer.
+        Paths and marks are formatted and written in chunks."""
         f.write("""<?xml version="1.0"?>
 <!DOCTYPE ipe SYSTEM "ipe.dtd">
 <ipe version="70000" creator="surfer2">
@@ -199,24 +349,703 @@ class GeometricGraph:
 """.encode())
         if markers:
             f.write("""<layer name="vertices"/>\n""".encode())
-        for vi1, vi2 in self.edges.keys():
-            v1 = self.vertices.list[vi1]
-            v2 = self.vertices.list[vi2]
-            f.write(("""<path layer="edges">
-    %s %s m
-    %s %s l
+        # every vertex is formatted once, most are shared by several edges
+        positions = self._coordinate_texts() if markers or len(self.edges) > 0 else []
+        path = """<path layer="edges">
+    %s m
+    %s l
   </path>
-"""%(v1.x,v1.y,v2.x,v2.y)).encode())
+"""
+        for rows in self._edge_chunks():
+            f.write(''.join([path%(positions[vi1], positions[vi2]) for vi1, vi2 in rows]).encode())
 
         if markers:
-            for v in self.vertices.list:
-                f.write(("""<use layer="vertices" name="mark/disk(sx)" pos="%s %s" size="normal" stroke="black"/>\n"""%(v.x, v.y)).encode())
+            use = """<use layer="vertices" name="mark/disk(sx)" pos="%s" size="normal" stroke="black"/>\n"""
+            for start in range(0, len(positions), self.WRITE_CHUNK):
+                f.write(''.join([use%(p,) for p in positions[start:start+self.WRITE_CHUNK]]).encode())
         f.write("</page>\n</ipe>\n".encode())
 
     def write_obj(self, f, zero_offset = False):
+        """Write a wavefront obj representation to the file f, formatted and written in chunks"""
         offset = 1 if not zero_offset else 0
         f.write("""# wavefront obj file\n""".encode())
-        for v in self.vertices.list:
-            f.write(("""v %s %s %s\n"""%(v.x, v.y, str(0.0))).encode())
-        for vi1, vi2 in self.edges.keys():
-            f.write(("""f %s %s\n"""%(vi1+offset,vi2+offset)).encode())
+        vertex = """v %%s %%s %s\n"""%(str(0.0),)
+        for rows in self._coordinate_chunks():
+            f.write(''.join([vertex%tuple(r) for r in rows]).encode())
+        for rows in self._edge_chunks(offset):
+            f.write(''.join(["""f %s %s\n"""%tuple(r) for r in rows]).encode())
+
+    def _coordinate_chunks(self):
+        """Yield the x and y coordinates of all vertices, in lists of up to WRITE_CHUNK rows."""
+        vertices = self.vertices.list
+        for start in range(0, len(vertices), self.WRITE_CHUNK):
+            yield [(v.x, v.y) for v in vertices[start:start+self.WRITE_CHUNK]]
+
+    def _edge_chunks(self, offset=0):
+        """Yield the vertex indices (plus offset) of all edges, in lists of up to WRITE_CHUNK rows."""
+        edges = iter(self.edges.keys())
+        while True:
+            rows = [(vi1+offset, vi2+offset) for vi1, vi2 in itertools.islice(edges, self.WRITE_CHUNK)]
+            if not rows:
+                return
+            yield rows
+
+    def _coordinate_texts(self):
+        """Return a list with the text "x y" of every vertex."""
+        texts = []
+        for rows in self._coordinate_chunks():
+            texts.extend(['%s %s'%(x, y) for x, y in rows])
+        return texts
+
+
+def _unique_in_order(keys):
+    """Deduplicate keys, keeping the order of their first occurrence.
+
+    Returns the indices of the first occurrences, in order, and for each key
+    the index of its representative within that order.
+    """
+    n = len(keys)
+    perm = np.argsort(keys)
+    sorted_keys = keys[perm]
+    starts_group = np.ones(n, dtype=bool)
+    starts_group[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group = np.cumsum(starts_group) - 1
+    group_first = np.minimum.reduceat(perm, np.flatnonzero(starts_group)) if n > 0 else perm
+
+    is_first = np.zeros(n, dtype=bool)
+    is_first[group_first] = True
+    rank_at = np.cumsum(is_first) - 1
+    rank = np.empty(n, dtype=np.int64)
+    rank[perm] = rank_at[group_first][group]
+    return np.flatnonzero(is_first), rank
+
+def _random_weights(n, rnd_lower, rnd_upper, round_n, rng):
+    """Draw n nonzero weights uniformly from [rnd_lower, rnd_upper), rounded to round_n digits if given."""
+    rng = np.random.default_rng(rng)
+    def draw(k):
+        r = rng.uniform(rnd_lower, rnd_upper, k)
+        return np.round(r, round_n) if round_n is not None else r
+    weights = draw(n)
+    zero = np.flatnonzero(weights == 0)
+    while len(zero) > 0:
+        weights[zero] = draw(len(zero))
+        zero = zero[weights[zero] == 0]
+    return weights
+
+def _row_hashes(rows):
+    """Return the bits and 64 bit hashes of the rows of a float64 array.
+
+    Rows that compare equal get the same hash; -0.0 is treated as 0.0.
+    """
+    # adding 0.0 turns -0.0 into 0.0, which compare equal as floats but not as bits
+    bits = np.ascontiguousarray(rows + 0.0).view(np.uint64)
+    keys = bits[:, 0] * np.uint64(0x9E3779B97F4A7C15)
+    for col in range(1, rows.shape[1]):
+        keys = (keys ^ (keys >> np.uint64(29))) * np.uint64(0xBF58476D1CE4E5B9) + bits[:, col]
+    return bits, keys
+
+def _first_occurrences(rows):
+    """Deduplicate the rows of a float64 array like _unique_in_order() does for keys."""
+    # Sorting 64 bit hashes of the rows is a lot faster than sorting the
+    # rows themselves.  Should two different rows ever share a hash, we
+    # notice and sort the rows after all.
+    bits, keys = _row_hashes(rows)
+    first, rank = _unique_in_order(keys)
+    if not (bits[first[rank]] == bits).all():
+        first, rank = _unique_in_order(bits.view(np.dtype((np.void, 8 * rows.shape[1]))).ravel())
+    return first, rank
+
+def _snap_targets(coordinates, eps):
+    """For each row of coordinates, the earliest row within distance eps that stays.
+
+    This is the vectorized equivalent of adding the rows, in order, to a
+    SnappingIndexedSet: rows that are not merged into an earlier row map
+    to themselves.  Returns the target of each row and the number of rows
+    merged.
+    """
+    n, dim = coordinates.shape
+    with np.errstate(invalid='ignore', over='ignore'):
+        cells = np.floor(coordinates / eps)
+    finite = np.flatnonzero(np.isfinite(cells).all(axis=1))
+    cells = cells[finite]
+    if len(cells) == 0:
+        return np.arange(n), 0
+    # Hash collisions between cells only bring up extra candidates, which
+    # fail the distance check like any other far away vertex.
+    _, cell_keys = _row_hashes(cells)
+    order = np.argsort(cell_keys)
+    sorted_keys = cell_keys[order]
+
+    # for each position in sorted order, the end of the run of its cell
+    ends = np.searchsorted(sorted_keys, sorted_keys, 'right')
+
+    eps2 = eps * eps
+    sources, targets = [], []
+    # Each pair of neighbouring cells is looked at once: the cell itself,
+    # and of the offsets o and -o only the one whose first non-zero entry
+    # is positive.
+    for offset in itertools.product((-1.0, 0.0, 1.0), repeat=dim):
+        if any(offset) and next(o for o in offset if o) < 0:
+            continue
+        _, keys = _row_hashes(cells + offset)
+        # searchsorted is a lot faster on sorted needles
+        needles = np.argsort(keys)
+        lo = np.empty(len(keys), dtype=np.int64)
+        lo[needles] = np.searchsorted(sorted_keys, keys[needles], 'left')
+        found = sorted_keys[np.minimum(lo, len(keys) - 1)] == keys
+        counts = np.where(found, ends[np.minimum(lo, len(keys) - 1)] - lo, 0)
+        src = np.repeat(np.arange(len(cells)), counts)
+        dst = order[np.arange(len(src)) - np.repeat(np.cumsum(counts) - counts - lo, counts)]
+        src, dst = np.maximum(src, dst), np.minimum(src, dst)
+        distinct = dst < src
+        src, dst = finite[src[distinct]], finite[dst[distinct]]
+        d = coordinates[src] - coordinates[dst]
+        close = (d*d).sum(axis=1) <= eps2
+        sources.append(src[close])
+        targets.append(dst[close])
+    sources = np.concatenate(sources)
+    targets = np.concatenate(targets)
+
+    result = np.arange(n)
+    stays = np.ones(n, dtype=bool)
+    merged = 0
+    # Only rows that have close earlier rows end up here, in order.  Whether
+    # such an earlier row stays has been settled by then.
+    by_source = np.lexsort((targets, sources))
+    for src, dst in zip(sources[by_source].tolist(), targets[by_source].tolist()):
+        if stays[src] and stays[dst]:
+            result[src] = dst
+            stays[src] = False
+            merged += 1
+    return result, merged
+
+class _ColumnarVertices:
+    """Read-only sequence view on the vertices of a ColumnarGeometricGraph.
+
+    Elements are materialized as Vertex2/Vertex3 objects on access.  The view
+    also provides the parts of the IndexedSet interface the writers use.
+    """
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __len__(self):
+        return self._graph._nv
+
+    def __getitem__(self, idx):
+        return self._graph.vertex_class(*self._graph.coordinates[idx].tolist())
+
+    def __iter__(self):
+        cls = self._graph.vertex_class
+        for c in self._graph.coordinates.tolist():
+            yield cls(*c)
+
+    @property
+    def list(self):
+        return self
+
+    def add(self, vertex):
+        return self._graph.add_vertex(vertex)
+
+    def __repr__(self):
+        return "%s(%d)"%(self.__class__.__name__, len(self))
+
+class _ColumnarEdges:
+    """Read-only mapping view on the edges of a ColumnarGeometricGraph.
+
+    Like GeometricGraph.edges it maps (idx0, idx1) tuples, with idx0 < idx1,
+    to {'w': ..., 'wa': ...} dicts.  Weights are given as strings, or None
+    when unset.
+    """
+    def __init__(self, graph):
+        self._graph = graph
+
+    def __len__(self):
+        return self._graph._ne
+
+    def __iter__(self):
+        for e in self._graph.edge_array.tolist():
+            yield tuple(e)
+
+    def keys(self):
+        return iter(self)
+
+    def __contains__(self, edge):
+        return self._graph._find_edge(*edge) is not None
+
+    def __getitem__(self, edge):
+        pos = self._graph._find_edge(*edge)
+        if pos is None:
+            raise KeyError(edge)
+        return self._graph._edge_attributes(pos)
+
+    def items(self):
+        g = self._graph
+        w = g.weights.tolist() if g.weights is not None else None
+        wa = g.additive_weights.tolist() if g.additive_weights is not None else None
+        for pos, e in enumerate(g.edge_array.tolist()):
+            yield tuple(e), {
+                'w': g._format_weight(w[pos], g._w_integral) if w is not None else None,
+                'wa': g._format_weight(wa[pos]) if wa is not None else None,
+            }
+
+    def __repr__(self):
+        return "%s(%d)"%(self.__class__.__name__, len(self))
+
+class ColumnarGeometricGraph(GeometricGraph):
+    """A geometric graph stored in contiguous arrays.
+
+    Vertex coordinates live in a float64 array of shape (V, dim), edges in an
+    int64 (or, as loaded from binary files, uint32) array of shape (E, 2) with
+    the smaller vertex index first, and edge
+    weights, once any edge has one, in float64 arrays where NaN means unset.
+
+    The element-wise interface of GeometricGraph keeps working, but code that
+    has many elements at hand should prefer add_vertices() and
+    add_edges_by_index(), which work on whole arrays at once.
+    """
+
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, source="unknown", fmt=None, dim=2):
+        if dim not in (2, 3):
+            raise GraphException("Unsupported dimension %s."%(dim,))
+        self.source = source
+        self.fmt = fmt
+        self.snap = None
+        self.dim = dim
+        self.vertex_class = Vertex2 if dim == 2 else Vertex3
+
+        self._coords = np.empty((0, dim))
+        self._nv = 0
+        self._vertex_index = None # built lazily, only for element-wise access
+
+        self._edges = np.empty((0, 2), dtype=np.int64)
+        self._w = None
+        self._w_integral = False # whether integral weights are written without fraction, as GeometricGraph does after rounding to 0 digits
+        self._wa = None
+        self._ne = 0
+        self._edge_index = None # built lazily, only for element-wise access
+
+    @classmethod
+    def from_arrays(cls, coordinates, edges, w=None, wa=None, source="unknown", fmt=None):
+        """Build a graph that takes over existing arrays.
+
+        The arrays are used as they are, without copying where possible and
+        without deduplicating vertices or edges; the caller vouches for them.
+        Read-only arrays (as obtained from a memory map) are fine, they get
+        copied when the graph is modified.
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        if coordinates.ndim != 2:
+            raise GraphException("Coordinates must be a 2-dimensional array.")
+        g = cls(source=source, fmt=fmt, dim=coordinates.shape[1])
+
+        edges = np.asarray(edges)
+        if edges.size == 0:
+            edges = np.empty((0, 2), dtype=np.int64)
+        edges = edges.reshape(-1, 2)
+        if len(edges) > 0:
+            if edges.min() < 0 or edges.max() >= len(coordinates):
+                raise GraphException("Edge refers to unknown vertex.")
+            if not (edges[:, 0] <= edges[:, 1]).all():
+                edges = np.sort(edges, axis=1)
+        if edges.dtype != np.int64 and edges.dtype != np.uint32:
+            edges = edges.astype(np.int64)
+
+        g._coords = coordinates
+        g._nv = len(coordinates)
+        g._edges = edges
+        g._ne = len(edges)
+        for name, a in (('_w', w), ('_wa', wa)):
+            if a is not None:
+                a = np.asarray(a, dtype=np.float64)
+                if a.shape != (g._ne,):
+                    raise GraphException("Weight array does not match edges.")
+                setattr(g, name, a)
+        return g
+
+    @classmethod
+    def from_graph(cls, graph):
+        """Build a columnar copy of a GeometricGraph."""
+        if isinstance(graph, ColumnarGeometricGraph):
+            g = cls.from_arrays(graph.coordinates.copy(), graph.edge_array.copy(),
+                                None if graph.weights is None else graph.weights.copy(),
+                                None if graph.additive_weights is None else graph.additive_weights.copy(),
+                                source=graph.source, fmt=graph.fmt)
+            g._w_integral = graph._w_integral
+            return g
+
+        coordinates = graph.coordinates
+        src, dst = graph.edges.arrays()
+        edges = np.stack((np.array(src, dtype=np.int64), np.array(dst, dtype=np.int64)), axis=1)
+        w = np.full(len(edges), np.nan)
+        wa = np.full(len(edges), np.nan)
+        integral = True
+        for pos, (_, _, edge_w, edge_wa) in enumerate(graph.edges.weighted()):
+            for a, value in ((w, edge_w), (wa, edge_wa)):
+                if value is None:
+                    continue
+                try:
+                    a[pos] = float(value)
+                except (TypeError, ValueError):
+                    raise GraphException("Edge weight '%s' is not a number, only numbers can be stored in arrays."%(value,))
+            if edge_w is not None:
+                integral = integral and str(edge_w).lstrip('+-').isdigit()
+        g = cls.from_arrays(coordinates, edges,
+                            w if not np.isnan(w).all() else None,
+                            wa if not np.isnan(wa).all() else None,
+                            source=graph.source, fmt=graph.fmt)
+        g._w_integral = integral and g._w is not None
+        return g
+
+    @property
+    def coordinates(self):
+        """The (V, dim) array of vertex coordinates."""
+        return self._coords[:self._nv]
+
+    @property
+    def edge_array(self):
+        """The (E, 2) array of edges, smaller vertex index first."""
+        return self._edges[:self._ne]
+
+    @property
+    def weights(self):
+        """The (E,) array of edge weights (NaN where unset), or None."""
+        return self._w[:self._ne] if self._w is not None else None
+
+    @property
+    def additive_weights(self):
+        """The (E,) array of additive edge weights (NaN where unset), or None."""
+        return self._wa[:self._ne] if self._wa is not None else None
+
+    @property
+    def vertices(self):
+        return _ColumnarVertices(self)
+
+    @property
+    def edges(self):
+        return _ColumnarEdges(self)
+
+    def __repr__(self):
+        return "%s(%d vertices, %d edges)"%(self.__class__.__name__, self._nv, self._ne)
+
+    @staticmethod
+    def _grow(a, length, needed, fill=None):
+        """Return a writable copy of a with room for needed rows, keeping the first length."""
+        capacity = max(needed, 2*len(a), ColumnarGeometricGraph.INITIAL_CAPACITY)
+        new = np.empty((capacity,) + a.shape[1:], dtype=a.dtype)
+        new[:length] = a[:length]
+        if fill is not None:
+            new[length:] = fill
+        return new
+
+    def _reserve_vertices(self, n):
+        """Make room for n more vertices.  Also ensures the array is writable."""
+        needed = self._nv + n
+        if needed > len(self._coords) or not self._coords.flags.writeable:
+            self._coords = self._grow(self._coords, self._nv, needed)
+
+    def _reserve_edges(self, n):
+        """Make room for n more edges.  Also ensures the arrays are writable."""
+        needed = self._ne + n
+        if needed > len(self._edges) or not self._edges.flags.writeable:
+            self._edges = self._grow(self._edges, self._ne, needed)
+        for name in ('_w', '_wa'):
+            a = getattr(self, name)
+            if a is not None and (len(a) < len(self._edges) or not a.flags.writeable):
+                setattr(self, name, self._grow(a, self._ne, len(self._edges), fill=np.nan))
+
+    def _weight_array(self, name):
+        """Return the (writable) weight array name, allocating it if need be."""
+        self._reserve_edges(0)
+        if getattr(self, name) is None:
+            setattr(self, name, np.full(len(self._edges), np.nan))
+        return getattr(self, name)
+
+    def _set_edge_weights(self, pos, w, wa):
+        for name, value in (('_w', w), ('_wa', wa)):
+            if value is not None:
+                self._weight_array(name)[pos] = float(value)
+            elif getattr(self, name) is not None:
+                self._weight_array(name)[pos] = np.nan
+
+    @staticmethod
+    def _format_weight(value, integral=False):
+        if value != value:
+            return None
+        if integral and value.is_integer():
+            return str(int(value))
+        return str(value)
+
+    def _edge_attributes(self, pos):
+        w, wa = self.weights, self.additive_weights
+        return {
+            'w': self._format_weight(float(w[pos]), self._w_integral) if w is not None else None,
+            'wa': self._format_weight(float(wa[pos])) if wa is not None else None,
+        }
+
+    def _vertex_key(self, vertex):
+        if self.dim == 2:
+            return (float(vertex.x), float(vertex.y))
+        return (float(vertex.x), float(vertex.y), float(vertex.z))
+
+    def _get_vertex_index(self):
+        if self._vertex_index is None:
+            # build from the back so the first of any duplicates wins
+            keys = list(map(tuple, self.coordinates.tolist()))
+            self._vertex_index = dict(zip(reversed(keys), range(self._nv-1, -1, -1)))
+        return self._vertex_index
+
+    @staticmethod
+    def _make_edge_keys(edges):
+        """The 64 bit keys (min<<32)|max of an (E, 2) array of sorted edges."""
+        return (edges[:, 0].astype(np.int64) << 32) | edges[:, 1]
+
+    def _get_edge_index(self):
+        if self._edge_index is None:
+            keys = self._make_edge_keys(self.edge_array).tolist()
+            self._edge_index = dict(zip(reversed(keys), range(self._ne-1, -1, -1)))
+        return self._edge_index
+
+    def _find_edge(self, idx0, idx1):
+        """Return the position of edge (idx0, idx1) in the edge array, or None."""
+        if idx0 > idx1:
+            idx0, idx1 = idx1, idx0
+        return self._get_edge_index().get((idx0 << 32) | idx1)
+
+    def add_vertex(self, vertex):
+        """Add a vertex (instance of Vertex2 or Vertex3, matching dim) to this graph."""
+        assert isinstance(vertex, self.vertex_class)
+        key = self._vertex_key(vertex)
+        index = self._get_vertex_index()
+        try:
+            return index[key]
+        except KeyError:
+            self._reserve_vertices(1)
+            idx = self._nv
+            self._coords[idx] = key
+            self._nv += 1
+            index[key] = idx
+            return idx
+
+    def add_vertices(self, coordinates):
+        """Add an (n, dim) array of vertex coordinates to this graph.
+
+        As with add_vertex, coordinates that are already in the graph (or
+        repeated within the array) are only stored once.  Returns an array
+        holding the vertex index of each row.
+
+        Deduplication sorts the graph's coordinates along with the new ones,
+        so prefer few large calls over many small ones.
+        """
+        coordinates = np.asarray(coordinates, dtype=np.float64)
+        if coordinates.size == 0:
+            return np.empty(0, dtype=np.int64)
+        coordinates = coordinates.reshape(-1, self.dim)
+
+        nv = self._nv
+        combined = np.concatenate((self.coordinates, coordinates)) if nv > 0 else coordinates
+        first, rank = _first_occurrences(combined)
+
+        # the graph's own vertices are distinct and come first, so they keep their indices.
+        new = combined[first[nv:]]
+        self._reserve_vertices(len(new))
+        self._coords[nv:nv+len(new)] = new
+        self._nv += len(new)
+        if self._vertex_index is not None:
+            self._vertex_index.update(zip(map(tuple, new.tolist()), range(nv, self._nv)))
+        return rank[nv:].astype(np.int64)
+
+    def _append_edge(self, idx0, idx1, w, wa):
+        self._reserve_edges(1)
+        pos = self._ne
+        self._edges[pos] = (idx0, idx1)
+        self._ne += 1
+        self._set_edge_weights(pos, w, wa)
+        self._get_edge_index()[(idx0 << 32) | idx1] = pos
+
+    def add_edge_by_index(self, idx0, idx1, w=None, wa=None, ignore_dups=False):
+        """Add an edge given by 2 vertices (instance of int) to this graph."""
+        assert isinstance(idx0, int)
+        assert isinstance(idx1, int)
+
+        if idx0 > idx1:
+            idx0, idx1 = idx1, idx0
+        pos = self._find_edge(idx0, idx1)
+        if pos is not None:
+            if not ignore_dups:
+                raise GraphException("Edge already exists.")
+            self._set_edge_weights(pos, w, wa)
+            return
+        self._append_edge(idx0, idx1, w, wa)
+
+    def add_edge_by_vertex(self, vertex0, vertex1, w=None, wa=None):
+        """Add an edge given by 2 vertices (instance of Vertex2) to this graph.
+
+        Adding an edge that already exists is an error and raises a GraphException.
+        """
+        idx0 = self.add_vertex(vertex0)
+        idx1 = self.add_vertex(vertex1)
+
+        edge = tuple(sorted((idx0, idx1)))
+        if idx0 == idx1:
+            print("Ignoring loop edge", edge, file=sys.stderr)
+            return
+        if self._find_edge(*edge) is not None:
+            raise GraphException("Edge already exists.")
+        self._append_edge(*edge, w, wa)
+
+    def add_edges_by_index(self, edges, w=None, wa=None, ignore_dups=False, ignore_loops=False):
+        """Add an (n, 2) array of edges, given by vertex indices, to this graph.
+
+        w and wa may be None, a single value for all new edges, or an array
+        with one value per edge (NaN for unset).
+
+        Duplicates, within edges or with the graph's existing edges, raise a
+        GraphException unless ignore_dups is set, in which case the edge keeps
+        its place and takes the weights given last.  Loops are added like any
+        other edge unless ignore_loops is set, in which case they are reported
+        and skipped like add_edge_by_vertex does.
+        """
+        edges = np.asarray(edges, dtype=np.int64)
+        if edges.size == 0:
+            return
+        edges = edges.reshape(-1, 2)
+        edges = np.stack((np.minimum(edges[:, 0], edges[:, 1]), np.maximum(edges[:, 0], edges[:, 1])), axis=1)
+        if edges[:, 0].min() < 0 or edges[:, 1].max() >= self._nv:
+            raise GraphException("Edge refers to unknown vertex.")
+        if self._nv > 2**32:
+            raise GraphException("Too many vertices.")
+
+        weights = []
+        for value in (w, wa):
+            if value is not None:
+                value = np.broadcast_to(np.asarray(value, dtype=np.float64), (len(edges),))
+            weights.append(value)
+
+        if ignore_loops:
+            loops = edges[:, 0] == edges[:, 1]
+            if loops.any():
+                for edge in edges[loops].tolist():
+                    print("Ignoring loop edge", tuple(edge), file=sys.stderr)
+                keep = ~loops
+                edges = edges[keep]
+                weights = [value[keep] if value is not None else None for value in weights]
+                if len(edges) == 0:
+                    return
+
+        ne = self._ne
+        keys = self._make_edge_keys(edges)
+        combined = np.concatenate((self._make_edge_keys(self.edge_array), keys)) if ne > 0 else keys
+        first, rank = _unique_in_order(combined)
+        if len(first) != len(combined) and not ignore_dups:
+            raise GraphException("Edge already exists.")
+
+        # existing edges are distinct and come first, so they keep their positions.
+        new = first[ne:] - ne
+        self._reserve_edges(len(new))
+        self._edges[ne:ne+len(new)] = edges[new]
+        self._ne += len(new)
+
+        positions = rank[ne:]
+        for name, value in zip(('_w', '_wa'), weights):
+            if value is not None:
+                self._weight_array(name)[positions] = value
+            elif getattr(self, name) is not None:
+                self._weight_array(name)[positions] = np.nan
+
+        if self._edge_index is not None:
+            self._edge_index.update(zip(keys[new].tolist(), range(ne, self._ne)))
+
+    def _graphml_node_texts(self):
+        for rows in self._coordinate_chunks():
+            for x, y in rows:
+                yield str(x), str(y)
+
+    def _coordinate_chunks(self):
+        coordinates = self.coordinates
+        for start in range(0, self._nv, self.WRITE_CHUNK):
+            yield coordinates[start:start+self.WRITE_CHUNK, :2].tolist()
+
+    def _edge_chunks(self, offset=0):
+        edges = self.edge_array
+        for start in range(0, self._ne, self.WRITE_CHUNK):
+            yield (edges[start:start+self.WRITE_CHUNK] + offset).tolist()
+
+    def _graphml_edge_texts(self):
+        edges, w, wa = self.edge_array, self.weights, self.additive_weights
+        fmt = self._format_weight
+        for start in range(0, self._ne, self.WRITE_CHUNK):
+            end = start + self.WRITE_CHUNK
+            w_chunk = w[start:end].tolist() if w is not None else None
+            wa_chunk = wa[start:end].tolist() if wa is not None else None
+            for i, (src, dst) in enumerate(edges[start:end].tolist()):
+                yield (src, dst,
+                       fmt(w_chunk[i], self._w_integral) if w_chunk is not None else None,
+                       fmt(wa_chunk[i]) if wa_chunk is not None else None)
+
+    def write_binary(self, f):
+        """Write the graph in binary format to the file f"""
+        if self._nv > 2**32:
+            raise GraphException("Too many vertices for the binary format.")
+        w, wa = self.weights, self.additive_weights
+        flags = (self.BINARY_FLAG_W if w is not None else 0) | (self.BINARY_FLAG_WA if wa is not None else 0)
+        if w is not None and self._w_integral:
+            flags |= self.BINARY_FLAG_W_INTEGRAL
+        f.write(self.BINARY_HEADER.pack(self.BINARY_MAGIC, self.BINARY_VERSION, self.dim, flags, 0, self._nv, self._ne))
+        for a, dtype in ((self.coordinates, '<f8'), (self.edge_array, '<u4'), (w, '<f8'), (wa, '<f8')):
+            if a is None:
+                continue
+            for start in range(0, len(a), self.WRITE_CHUNK):
+                f.write(np.ascontiguousarray(a[start:start+self.WRITE_CHUNK], dtype=dtype).tobytes())
+
+    def randomize_weights(self, rnd_lower=0.20, rnd_upper=5.0, round_n=None, rng=None):
+        self._weight_array('_w')[:self._ne] = _random_weights(self._ne, rnd_lower, rnd_upper, round_n, rng)
+        self._w_integral = round_n == 0
+
+    def transform_coordinates(self, scale=None, transform=None, on_collision='error'):
+        if on_collision not in ('error', 'merge'):
+            raise ValueError("Invalid collision handling '%s'."%(on_collision,))
+        transform = self._combined_transform(scale, transform)
+        if transform is None:
+            return 0
+        coordinates = transform.apply(self.coordinates)
+        first, rank = _first_occurrences(coordinates)
+        merged = self._nv - len(first)
+        if merged > 0 and on_collision == 'error':
+            raise GraphException("Transformation makes %d vertices coincide with others."%(merged,))
+        self._coords = coordinates
+        self._vertex_index = None
+        if merged > 0:
+            self._merge_vertices(first[rank])
+        return merged
+
+    def snap_vertices(self, eps):
+        if not eps > 0:
+            raise ValueError("Snapping distance must be positive.")
+        targets, merged = _snap_targets(self.coordinates, eps)
+        if merged > 0:
+            self._merge_vertices(targets)
+        return merged
+
+    def _merge_vertices(self, targets):
+        """Merge each vertex i into vertex targets[i], which is either i or an earlier vertex that stays.
+
+        Edges follow their vertices like in GeometricGraph._remap_vertices()."""
+        stays = targets == np.arange(self._nv)
+        new_index = np.cumsum(stays) - 1
+        mapping = new_index[targets]
+        edges = mapping[self.edge_array]
+        edges = np.stack((np.minimum(edges[:, 0], edges[:, 1]), np.maximum(edges[:, 0], edges[:, 1])), axis=1)
+        keep = np.flatnonzero(edges[:, 0] != edges[:, 1])
+        first, _ = _unique_in_order(self._make_edge_keys(edges[keep]))
+        keep = keep[first]
+
+        self._coords = self.coordinates[stays]
+        self._nv = len(self._coords)
+        self._vertex_index = None
+        self._edges = edges[keep]
+        self._w = self.weights[keep] if self._w is not None else None
+        self._wa = self.additive_weights[keep] if self._wa is not None else None
+        self._ne = len(keep)
+        self._edge_index = None
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.EdgeStore"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import unittest
+
+from ORD53.common.EdgeStore import EdgeStore
+
+class TestEdgeStore(unittest.TestCase):
+    """Tests for EdgeStore."""
+
+    def test_dict_interface(self):
+        """The store reads like a dict of weight dicts."""
+        e = EdgeStore()
+        self.assertTrue(e.add(3, 1))
+        self.assertTrue(e.add(0, 1, w='2'))
+        self.assertFalse(e.add(1, 3, w='5'))
+        e[(2, 0)] = {'w': None, 'wa': '0.5'}
+        self.assertEqual(list(e), [(1, 3), (0, 1), (0, 2)])
+        self.assertEqual(list(e.items()), [((1, 3), {'w': None, 'wa': None}), ((0, 1), {'w': '2', 'wa': None}), ((0, 2), {'w': None, 'wa': '0.5'})])
+        self.assertEqual(list(e.weighted()), [(1, 3, None, None), (0, 1, '2', None), (0, 2, None, '0.5')])
+        self.assertIn((3, 1), e)
+        self.assertNotIn((0, 3), e)
+        self.assertNotIn((-1, 3), e)
+        self.assertEqual(e[(1, 0)], {'w': '2', 'wa': None})
+        self.assertRaises(KeyError, e.__getitem__, (0, 3))
+        self.assertEqual(len(e), 3)
+
+    def test_weights(self):
+        """Weights are changed in place, and only edges with weights keep any."""
+        e = EdgeStore()
+        e.add(0, 1, w='2')
+        e.set_weight((1, 0), 'wa', '1')
+        self.assertEqual(e[(0, 1)], {'w': '2', 'wa': '1'})
+        e[(0, 1)] = {'w': None, 'wa': None}
+        self.assertEqual(e[(0, 1)], {'w': None, 'wa': None})
+        self.assertRaises(KeyError, e.set_weight, (0, 2), 'w', '1')
+        self.assertRaises(ValueError, e.add, 0, 2**32)
+
+    def test_set_weights(self):
+        """A whole column of weights is set at once, leaving the other one alone."""
+        e = EdgeStore()
+        for i in range(4):
+            e.add(i, i + 1)
+        e.set_weight((3, 4), 'w', '7')
+        e.set_weights('wa', ['1', None, '3'])
+        self.assertEqual(list(e.weighted()), [(0, 1, None, '1'), (1, 2, None, None), (2, 3, None, '3'), (3, 4, '7', None)])
+        e.set_weights('w', map(str, range(4)))
+        e.set_weights('wa', [None] * 4)
+        self.assertEqual(list(e.weighted()), [(0, 1, '0', None), (1, 2, '1', None), (2, 3, '2', None), (3, 4, '3', None)])
+        self.assertRaises(KeyError, e.set_weights, 'x', [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.cache"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import os
+import tempfile
+import time
+import unittest
+
+from ORD53.common.cache import ConversionCache, STALE_AGE
+
+class TestConversionCache(unittest.TestCase):
+    """Tests for ConversionCache."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ConversionCache(self.tmp.name, 25)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _read(self, files):
+        result = []
+        for f in files:
+            with f:
+                result.append(f.read())
+        return result
+
+    def test_key(self):
+        """Keys depend on the content and on all parameters."""
+        key = ConversionCache.make_key(b'2\n0 0\n1 1\n', loader='.line', scale=None)
+        self.assertEqual(key, ConversionCache.make_key('2\n0 0\n1 1\n', scale=None, loader='.line'))
+        self.assertNotEqual(key, ConversionCache.make_key(b'2\n0 0\n1 2\n', loader='.line', scale=None))
+        self.assertNotEqual(key, ConversionCache.make_key(b'2\n0 0\n1 1\n', loader='.line', scale=2.0))
+
+    def test_put_get(self):
+        """Stored outputs come back in order."""
+        self.assertIsNone(self.cache.get('a'))
+        writers = [lambda f: f.write(b'first'), lambda f: f.write(b'second')]
+        self.assertEqual(self._read(self.cache.put('a', writers)), [b'first', b'second'])
+        self.assertEqual(self._read(self.cache.get('a')), [b'first', b'second'])
+
+    def test_evict(self):
+        """The least recently used entries go first, the one just stored stays."""
+        for key in ('a', 'b'):
+            self._read(self.cache.put(key, [lambda f: f.write(b'x' * 10)]))
+            os.utime(os.path.join(self.tmp.name, key), (time.time() - 100, time.time() - 100))
+        self._read(self.cache.get('a'))
+        self._read(self.cache.put('c', [lambda f: f.write(b'x' * 10)]))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self._read(self.cache.get('a')), [b'x' * 10])
+
+        self._read(self.cache.put('d', [lambda f: f.write(b'x' * 30)]))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['d'])
+
+    def test_evicted_while_reading(self):
+        """Files handed out stay readable when their entry is evicted."""
+        files = self.cache.put('a', [lambda f: f.write(b'first'), lambda f: f.write(b'second')])
+        self._read(self.cache.put('b', [lambda f: f.write(b'x' * 30)]))
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(self._read(files), [b'first', b'second'])
+
+    def test_leftovers(self):
+        """Failed stores leave nothing behind, stale leftovers are swept, fresh ones count."""
+        def fail(f):
+            f.write(b'partial')
+            raise ValueError("cannot write")
+        self.assertRaises(ValueError, self.cache.put, 'a', [lambda f: f.write(b'x'), fail])
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+        for name, age in (('.tmp-stale', STALE_AGE + 100), ('.tmp-fresh', 0)):
+            os.mkdir(os.path.join(self.tmp.name, name))
+            path = os.path.join(self.tmp.name, name, '000')
+            with open(path, 'wb') as f:
+                f.write(b'x' * 20)
+            for p in (path, os.path.dirname(path)):
+                os.utime(p, (time.time() - age, time.time() - age))
+        self._read(self.cache.put('b', [lambda f: f.write(b'x' * 5)]))
+        self._read(self.cache.put('c', [lambda f: f.write(b'x' * 5)]))
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['.tmp-fresh', 'c'])
+
+if __name__ == '__main__':
+    unittest.main()
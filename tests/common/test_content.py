@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.content"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import doctest
+import io
+import mmap
+import tempfile
+import unittest
+
+import ORD53.common.content
+from ORD53.common.content import read_input, as_file
+
+def load_tests(loader, tests, pattern): # pylint: disable=unused-argument
+    """Add DocTestSuite to unittest tests."""
+    tests.addTests(doctest.DocTestSuite(ORD53.common.content))
+    return tests
+
+class TestContent(unittest.TestCase):
+    """Additional unittests for content module."""
+
+    def test_read_input(self):
+        """Regular files are memory mapped, other file objects are read."""
+        with tempfile.TemporaryFile() as f:
+            f.write(b"2\n0 0\n1 1\n")
+            f.seek(0)
+            content = read_input(f)
+            self.assertIsInstance(content, mmap.mmap)
+            self.assertEqual(content[:], b"2\n0 0\n1 1\n")
+            content.close()
+        self.assertEqual(read_input(io.BytesIO(b"abc")), b"abc")
+
+    def test_as_file(self):
+        """as_file reads str, bytes and mmap alike."""
+        for content in ("1 2\n", b"1 2\n"):
+            with as_file(content) as f:
+                self.assertEqual(f.read(), b"1 2\n")
+
+if __name__ == '__main__':
+    unittest.main()
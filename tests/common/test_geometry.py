@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.geometry"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import unittest
+
+import numpy as np
+
+from ORD53.common.geometry import Vertex2, Vertex3, AffineTransform, sample_arc
+
+class TestVertex(unittest.TestCase):
+    """Tests for Vertex2 and Vertex3."""
+
+    def test_compare(self):
+        """Vertices are equal, and hash alike, if all their coordinates are."""
+        self.assertEqual(Vertex2(1.0, 2.0), Vertex2(1, 2))
+        self.assertEqual(hash(Vertex2(1.0, 2.0)), hash(Vertex2(1, 2)))
+        self.assertNotEqual(Vertex2(1.0, 2.0), Vertex2(2.0, 1.0))
+        self.assertNotEqual(Vertex3(1.0, 2.0, 3.0), Vertex3(1.0, 2.0, 4.0))
+        self.assertNotEqual(Vertex2(1.0, 2.0), (1.0, 2.0))
+        self.assertEqual(len({Vertex3(0, 0, 1), Vertex3(0.0, 0.0, 1.0), Vertex3(0, 1, 0)}), 2)
+
+    def test_vector(self):
+        """Vector operations."""
+        a, b = Vertex2(1.0, 2.0), Vertex2(3.0, 5.0)
+        self.assertEqual(a + b, Vertex2(4.0, 7.0))
+        self.assertEqual(b - a, Vertex2(2.0, 3.0))
+        self.assertEqual(2 * a, Vertex2(2.0, 4.0))
+        self.assertEqual(a.dotproduct(b), 13.0)
+        self.assertEqual(Vertex3(1.0, 2.0, 2.0).lensquared(), 9.0)
+
+    def test_slots(self):
+        """Vertices carry no __dict__."""
+        self.assertRaises(AttributeError, setattr, Vertex2(0, 0), 'z', 0)
+
+class TestAffineTransform(unittest.TestCase):
+    """Tests for AffineTransform."""
+
+    def test_steps(self):
+        """Steps apply in the order they are added."""
+        c = np.array([(1.0, 2.0), (3.0, 5.0)])
+        t = AffineTransform().translated(1, 1).rotated(90).scaled(2)
+        self.assertTrue(np.allclose(t.apply(c), [(-6.0, 4.0), (-12.0, 8.0)]))
+        t = AffineTransform().transformed(1, 0, 0, -1, 0, 10)
+        self.assertEqual(t.apply(c).tolist(), [[1.0, 8.0], [3.0, 5.0]])
+
+    def test_3d(self):
+        """Plane steps leave z alone, scaling does not."""
+        c = np.array([(1.0, 2.0, 3.0)])
+        self.assertTrue(np.allclose(AffineTransform().rotated(180).translated(1, 1).apply(c), [(0.0, -1.0, 3.0)]))
+        self.assertEqual(AffineTransform().scaled(2).apply(c).tolist(), [[2.0, 4.0, 6.0]])
+
+    def test_normalized(self):
+        """Normalizing fits the image into the unit box, keeping the aspect ratio."""
+        c = np.array([(1.0, 2.0), (5.0, 4.0), (3.0, 3.0)])
+        t = AffineTransform().scaled(-1).normalized(c)
+        self.assertTrue(np.allclose(t.apply(c), [(1.0, 0.5), (0.0, 0.0), (0.5, 0.25)]))
+
+class TestSampleArc(unittest.TestCase):
+    """Tests for sample_arc."""
+
+    def test_circle(self):
+        """Samples lie on the arc, in order, and chords stay within the tolerance."""
+        points = sample_arc((2, 0, 0, 2, 1, 1), (3, 1), (-1, 1), 0.01)
+        self.assertTrue(np.allclose(np.hypot(points[:, 0] - 1, points[:, 1] - 1), 2))
+        self.assertTrue((points[:, 1] > 1).all())
+        self.assertTrue((np.diff(points[:, 0]) < 0).all())
+        chain = np.concatenate(([(3, 1)], points, [(-1, 1)]))
+        middles = (chain[1:] + chain[:-1]) / 2
+        errors = 2 - np.hypot(middles[:, 0] - 1, middles[:, 1] - 1)
+        self.assertLessEqual(errors.max(), 0.01)
+        self.assertGreater(errors.max(), 0.005)
+
+    def test_tolerance(self):
+        """Finer tolerances and larger ellipses take more segments."""
+        n = len(sample_arc((1, 0, 0, 1, 0, 0), (1, 0), (0, 1), 0.01))
+        self.assertGreater(len(sample_arc((1, 0, 0, 1, 0, 0), (1, 0), (0, 1), 0.001)), n)
+        self.assertGreater(len(sample_arc((1, 0, 0, 5, 0, 0), (1, 0), (0, 5), 0.01)), n)
+
+    def test_direction(self):
+        """Arcs run counterclockwise on the unit circle, so mirrored ones run clockwise."""
+        self.assertGreater(sample_arc((1, 0, 0, 1, 0, 0), (1, 0), (-1, 0), 0.1)[:, 1].min(), 0)
+        self.assertLess(sample_arc((1, 0, 0, -1, 0, 0), (1, 0), (-1, 0), 0.1)[:, 1].max(), 0)
+        self.assertEqual(len(sample_arc((1, 0, 0, 1, 0, 0), (1, 0), (1, 0), 10)), 2)
+        self.assertRaises(ValueError, sample_arc, (1, 0, 2, 0, 0, 0), (1, 0), (0, 1), 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
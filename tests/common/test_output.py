@@ -0,0 +1,45 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.output"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import functools
+import os
+import tempfile
+import unittest
+
+from ORD53.common.output import write_files
+
+def _write(data, f):
+    f.write(data)
+
+def _fail(f):
+    raise ValueError("cannot write")
+
+class TestWriteFiles(unittest.TestCase):
+    """Tests for write_files."""
+
+    def test_write_files(self):
+        """Every path gets what its writer writes, whether written in parallel or not."""
+        with tempfile.TemporaryDirectory() as tmp:
+            data = [b"%d\n"%(i,) * (i+1) for i in range(5)]
+            for jobs in (1, 3):
+                paths = [os.path.join(tmp, "%d-%d"%(jobs, i)) for i in range(len(data))]
+                write_files([functools.partial(_write, d) for d in data], paths, jobs)
+                for p, d in zip(paths, data):
+                    with open(p, 'rb') as f:
+                        self.assertEqual(f.read(), d)
+
+    def test_errors(self):
+        """Errors of writers are raised."""
+        with tempfile.TemporaryDirectory() as tmp:
+            for jobs in (1, 2):
+                paths = [os.path.join(tmp, "a"), os.path.join(tmp, "b")]
+                self.assertRaises(ValueError, write_files, [functools.partial(_write, b"x"), _fail], paths, jobs)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.parse"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import doctest
+import unittest
+
+import ORD53.common.parse
+from ORD53.common.parse import parse_floats, count_nonblank_lines, split_lines_at, count_tokens_per_line, scan_lines, parse_blocks
+
+def load_tests(loader, tests, pattern): # pylint: disable=unused-argument
+    """Add DocTestSuite to unittest tests."""
+    tests.addTests(doctest.DocTestSuite(ORD53.common.parse))
+    return tests
+
+class TestParse(unittest.TestCase):
+    """Additional unittests for parse module."""
+
+    def test_chunks(self):
+        """Results do not depend on where the input gets split."""
+        data = b"3\n 1.5 2\n\n  \n3 4\r\n5 6\n\n2\n7 8\n9 10"
+        for size in range(1, len(data) + 1):
+            pieces = list(split_lines_at(data, size))
+            self.assertEqual(b"".join(pieces), data)
+            self.assertTrue(all(p.endswith(b"\n") for p in pieces[:-1]))
+        self.assertEqual(parse_floats(data).tolist(), [3, 1.5, 2, 3, 4, 5, 6, 2, 7, 8, 9, 10])
+        self.assertEqual(count_nonblank_lines(data), 7)
+        self.assertEqual(count_nonblank_lines(data.decode()), 7)
+        self.assertEqual(count_tokens_per_line(data).tolist(), [1, 2, 2, 2, 1, 2, 2])
+
+    def test_parallel(self):
+        """Parsing in several processes gives the same results, in order."""
+        data = b"".join(b"%d\n"%(n,) + b"".join(b"%d.5 %d\n"%(i, n) for i in range(n)) + b"\n" for n in range(1, 60))
+        saved = ORD53.common.parse.PARALLEL_MIN_SIZE
+        ORD53.common.parse.PARALLEL_MIN_SIZE = 0
+        try:
+            for jobs in (2, 3, 7):
+                numbers, tokens = scan_lines(data, jobs)
+                self.assertEqual(numbers.tolist(), parse_floats(data).tolist())
+                self.assertEqual(tokens.tolist(), count_tokens_per_line(data).tolist())
+            coordinates, lengths = parse_blocks(data, 4)
+        finally:
+            ORD53.common.parse.PARALLEL_MIN_SIZE = saved
+        self.assertEqual(lengths.tolist(), list(range(1, 60)))
+        self.assertEqual(coordinates[-1].tolist(), [58.5, 59])
+
+    def test_blocks(self):
+        """Block structure is checked line by line."""
+        for data in (b"2\n0 0\n1 1 1\n", b"0 0\n1\n1 1\n", b"2\n0 0\n1\n1 1\n", b"1.5\n0 0\n"):
+            self.assertRaises(ValueError, parse_blocks, data)
+        coordinates, lengths = parse_blocks(b"0\n\n2\n0 0\n1 1")
+        self.assertEqual(lengths.tolist(), [0, 2])
+        self.assertEqual(coordinates.tolist(), [[0, 0], [1, 1]])
+
+if __name__ == '__main__':
+    unittest.main()
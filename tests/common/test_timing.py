@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.common.timing"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import io
+import json
+import tracemalloc
+import unittest
+
+from ORD53.common import timing
+from ORD53.common.timing import PhaseTimer
+
+class TestPhaseTimer(unittest.TestCase):
+    """Tests for PhaseTimer and its hooks."""
+
+    def test_phases(self):
+        """Phases are recorded in order, passed to hooks and reported."""
+        seen = []
+        timing.add_hook(seen.append)
+        try:
+            timer = PhaseTimer("input")
+            with timer.phase('load') as p:
+                p.elements = 42
+            with timer.phase('write'):
+                pass
+        finally:
+            timing.remove_hook(seen.append)
+        with PhaseTimer("other").phase('load'):
+            pass
+
+        self.assertEqual([p.name for p in timer.phases], ['load', 'write'])
+        self.assertEqual(seen, timer.phases)
+        self.assertEqual(timer.phases[0].elements, 42)
+        self.assertGreaterEqual(timer.phases[0].wall, 0)
+        self.assertGreater(timer.phases[0].peak_rss, 0)
+        self.assertIsNone(timer.phases[0].peak_traced)
+
+        f = io.StringIO()
+        timer.report(f)
+        self.assertIn("load", f.getvalue())
+        f = io.StringIO()
+        timer.report(f, 'json')
+        report = json.loads(f.getvalue())
+        self.assertEqual(report['source'], "input")
+        self.assertEqual([p['elements'] for p in report['phases']], [42, None])
+
+    def test_trace_memory(self):
+        """With trace_memory, each phase reports its own allocation peak."""
+        was_tracing = tracemalloc.is_tracing()
+        try:
+            timer = PhaseTimer("input", trace_memory=True)
+            with timer.phase('big'):
+                data = bytearray(8 * 2**20)
+                del data
+            with timer.phase('small'):
+                pass
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+        self.assertGreaterEqual(timer.phases[0].peak_traced, 8 * 2**20)
+        self.assertLess(timer.phases[1].peak_traced, 8 * 2**20)
+
+if __name__ == '__main__':
+    unittest.main()
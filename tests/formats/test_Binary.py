@@ -0,0 +1,71 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.Binary"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import io
+import unittest
+
+from ORD53.common.geometry import Vertex2
+from ORD53.formats.Binary import BinaryLoader
+from ORD53.formats.Line import LineLoader
+from ORD53.graph.Graph import GeometricGraph, ColumnarGeometricGraph, GraphException
+
+class TestBinaryLoader(unittest.TestCase):
+    """Tests for the binary format."""
+
+    @staticmethod
+    def _roundtrip(g):
+        f = io.BytesIO()
+        g.write_binary(f)
+        return BinaryLoader.load(f.getvalue())
+
+    def test_roundtrip(self):
+        """Binary output loads back into the same graph, sharing the input buffer."""
+        g = LineLoader.load("3\n0 0\n1 0\n1.5 -2.25\n")
+        g.add_edge_by_index(0, 2, w='2.5')
+        h = self._roundtrip(g)
+        self.assertIsInstance(h, ColumnarGeometricGraph)
+        self.assertEqual(list(h.vertices), list(g.vertices))
+        self.assertEqual(list(h.edges.items()), list(g.edges.items()))
+        self.assertIsNone(h.additive_weights)
+        self.assertFalse(h.coordinates.flags.writeable)
+
+        h.add_edge_by_vertex(Vertex2(0.0, 0.0), Vertex2(7.0, 7.0))
+        self.assertEqual(list(h.edges), [(0, 1), (1, 2), (0, 2), (0, 3)])
+
+    def test_element_graph(self):
+        """Graphs of any kind can be written."""
+        g = GeometricGraph()
+        g.add_edge_by_vertex(Vertex2(0, 0), Vertex2(1, 1), wa='0.5')
+        h = self._roundtrip(g)
+        self.assertEqual(list(h.edges.items()), [((0, 1), {'w': None, 'wa': '0.5'})])
+
+    def test_weights(self):
+        """Whole weights keep their form, weights that are no numbers are refused."""
+        g = LineLoader.load("3\n0 0\n1 0\n1 1\n")
+        g.randomize_weights(1.0, 3.0, round_n=0, rng=1)
+        h = self._roundtrip(g)
+        self.assertEqual([a['w'] for _, a in h.edges.items()], [a['w'] for _, a in g.edges.items()])
+        self.assertEqual([a['w'] for _, a in self._roundtrip(h).edges.items()], [a['w'] for _, a in g.edges.items()])
+
+        g = GeometricGraph()
+        g.add_edge_by_vertex(Vertex2(0, 0), Vertex2(1, 1), w='1/3')
+        self.assertRaises(GraphException, g.write_binary, io.BytesIO())
+
+    def test_errors(self):
+        """Broken files are rejected."""
+        f = io.BytesIO()
+        LineLoader.load("2\n0 0\n1 0\n").write_binary(f)
+        data = f.getvalue()
+        self.assertRaises(ValueError, BinaryLoader.load, data[:-1])
+        self.assertRaises(ValueError, BinaryLoader.load, data[:10])
+        self.assertRaises(ValueError, BinaryLoader.load, b'X' + data[1:])
+        self.assertRaises(ValueError, BinaryLoader.load, data[:8] + b'\x02' + data[9:])
+
+if __name__ == '__main__':
+    unittest.main()
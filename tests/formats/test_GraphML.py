@@ -0,0 +1,86 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.GraphML"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import argparse
+import io
+import unittest
+
+from ORD53.common.geometry import Vertex2
+from ORD53.formats.GraphML import GraphMLLoader
+from ORD53.graph.Graph import GeometricGraph
+
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  <key for="node" attr.name="vertex-coordinate-x" attr.type="string" id="x"/>
+  <key for="node" attr.name="vertex-coordinate-y" attr.type="string" id="y"/>
+  <key for="edge" attr.name="edge-weight" attr.type="string" id="w"><default>1.0</default></key>
+  <key for="edge" attr.name="edge-weight-additive" attr.type="string" id="wa"><default>0.5</default></key>
+  <graph edgedefault="undirected">
+    <node id="a"><data key="x">0</data><data key="y">0</data></node>
+    <edge source="a" target="b"><data key="w">3</data></edge>
+    <node id="b"><data key="x">1</data><data key="y">0</data></node>
+    <node id="c"><data key="x">1</data><data key="y">1</data></node>
+    <edge source="c" target="a"><data key="wa">0.0</data></edge>
+  </graph>
+  <graph edgedefault="undirected">
+    <node id="a"><data key="x">5</data><data key="y">5</data></node>
+    <node id="b"><data key="x">6</data><data key="y">5</data></node>
+    <edge source="a" target="b"/>
+  </graph>
+</graphml>
+"""
+
+class TestGraphMLLoader(unittest.TestCase):
+    """Tests for the graphml loader."""
+
+    def test_load(self):
+        """All graphs are loaded, with defaults applied and forward references resolved."""
+        graphs = GraphMLLoader.load(DOCUMENT)
+        self.assertEqual(len(graphs), 2)
+        g0, g1 = graphs
+        self.assertEqual(list(g0.vertices), [Vertex2('0', '0'), Vertex2('1', '0'), Vertex2('1', '1')])
+        self.assertEqual(list(g0.edges.items()), [((0, 1), {'w': '3', 'wa': '0.5'}), ((0, 2), {'w': None, 'wa': None})])
+        self.assertEqual(list(g1.edges.items()), [((0, 1), {'w': None, 'wa': '0.5'})])
+
+    def test_select(self):
+        """With args.graph, only that graph is built; the others are not looked at."""
+        broken = DOCUMENT.replace('<node id="a"><data key="x">0</data><data key="y">0</data></node>', '<node id="a"/>')
+        broken = broken.replace('</graphml>', '<graph id="last"><node id="z"/></graph>\n</graphml>')
+        self.assertRaises(Exception, GraphMLLoader.load, broken)
+
+        g, = GraphMLLoader.load(broken, args=argparse.Namespace(graph=1))
+        self.assertEqual(list(g.vertices), [Vertex2('5', '5'), Vertex2('6', '5')])
+        self.assertEqual(len(g.edges), 1)
+        self.assertRaises(Exception, GraphMLLoader.load, DOCUMENT, args=argparse.Namespace(graph=2))
+        self.assertEqual(len(GraphMLLoader.load(DOCUMENT, args=argparse.Namespace(graph=None))), 2)
+
+    def test_scan(self):
+        """scan() counts the nodes and edges of every graph, and its handles load them."""
+        handles = GraphMLLoader.scan(DOCUMENT.replace('</graphml>', '<graph id="empty"/>\n</graphml>'), name="doc")
+        self.assertEqual([(h.index, h.id, h.nodes, h.edges) for h in handles], [(0, None, 3, 2), (1, None, 2, 1), (2, 'empty', 0, 0)])
+        g = handles[1].load()
+        self.assertEqual(g.source, "doc")
+        self.assertEqual(list(g.vertices), [Vertex2('5', '5'), Vertex2('6', '5')])
+        self.assertEqual(len(handles[2].load().vertices), 0)
+
+    def test_round_trip(self):
+        """Writing and loading a graph again gives the same output."""
+        g = GeometricGraph(source="test")
+        g.add_edge_by_vertex(Vertex2(0.5, 1.0), Vertex2(2.0, 3.0), w='2.5')
+        g.add_edge_by_vertex(Vertex2(2.0, 3.0), Vertex2(4.0, 1.0), wa='1')
+        f = io.BytesIO()
+        g.write_graphml(f)
+        loaded, = GraphMLLoader.load(f.getvalue().decode(), name="test")
+        loaded.fmt = None
+        f2 = io.BytesIO()
+        loaded.write_graphml(f2)
+        self.assertEqual(f.getvalue(), f2.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
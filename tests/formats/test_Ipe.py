@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.Ipe"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import argparse
+import unittest
+
+import numpy as np
+
+from ORD53.common.geometry import Vertex2
+from ORD53.formats.Ipe import IpeLoader
+
+DOCUMENT = b"""<?xml version="1.0"?>
+<ipe version="70206">
+<page>
+<layer name="alpha"/>
+<layer name="beta"/>
+<view layers="alpha" active="alpha"/>
+<view layers="alpha beta" active="beta"/>
+<path layer="alpha">
+64 64 m
+128 64 l 128 128 l
+h
+</path>
+<path pen="2">
+0 0 m
+10 0 l
+</path>
+<path layer="beta" matrix="0 1 -1 0 5 5">
+1 2 m
+3 4 l
+</path>
+</page>
+</ipe>
+"""
+
+class TestIpeLoader(unittest.TestCase):
+    """Tests for the Ipe loader."""
+
+    def test_parse_path(self):
+        """Paths are split into points and segments; h closes to the first point."""
+        points, segments = IpeLoader._parse_path("0 0 m 1 0 l\n1 1 l\n5 5 m\n6 6 l\nh\n")
+        self.assertEqual(points.tolist(), [[0, 0], [1, 0], [1, 1], [5, 5], [6, 6]])
+        self.assertEqual(segments.tolist(), [[0, 1], [1, 2], [3, 4], [4, 0]])
+
+        points, _ = IpeLoader._parse_path("1 2 m\n3 4 l\n", [2, 0, 0, 2, 1, 0])
+        self.assertEqual(points.tolist(), [[3, 4], [7, 8]])
+
+        points, segments = IpeLoader._parse_path("1 0 m\n1 0 0 1 0 0 -1 0 a\n-1 -1 l\n", [2, 0, 0, 2, 0, 0], 0.1)
+        self.assertTrue(np.allclose(np.hypot(*points[:-1].T), 2))
+        self.assertEqual(points[-1].tolist(), [-2, -2])
+        self.assertEqual(segments.tolist(), [[i, i+1] for i in range(len(points)-1)])
+        self.assertGreater(len(points), len(IpeLoader._parse_path("1 0 m\n1 0 0 1 0 0 -1 0 a\n", None, 0.1)[0]))
+
+        for text in ("0 0 l\n1 1 l\n", "0 0 m\n", "0 0 m\n1 1 l\nh\n2 2 l\n", "0 0 m\n1 l\n", "0 0 m\n1 1 c\n"):
+            self.assertRaises(Exception, IpeLoader._parse_path, text)
+
+    def test_views(self):
+        """Every view gets a graph with the paths of its layers."""
+        g1, g2 = IpeLoader.load(DOCUMENT, "doc")
+        self.assertEqual(g1.source, "doc (view 1)")
+        self.assertEqual(list(g1.vertices), [Vertex2(64.0, 64.0), Vertex2(128.0, 64.0), Vertex2(128.0, 128.0), Vertex2(0.0, 0.0), Vertex2(10.0, 0.0)])
+        self.assertEqual(list(g1.edges), [(0, 1), (1, 2), (0, 2), (3, 4)])
+        self.assertTrue(np.isnan(g1.weights[:3]).all())
+        self.assertEqual(g1.weights[3], 2.0)
+        self.assertEqual(len(g2.edges), 5)
+        self.assertEqual(list(g2.vertices)[5:], [Vertex2(3.0, 6.0), Vertex2(1.0, 8.0)])
+
+    def test_flatten(self):
+        """With flatten, all paths end up in a single graph."""
+        g = IpeLoader.load(DOCUMENT, "doc", argparse.Namespace(flatten=True, arc_tolerance=None))
+        self.assertEqual(g.source, "doc")
+        self.assertEqual(len(g.vertices), 7)
+        self.assertEqual(len(g.edges), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.Line and ORD53.formats.Poly"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import unittest
+
+from ORD53.common.geometry import Vertex2
+from ORD53.formats.Line import LineLoader
+from ORD53.formats.Poly import PolyLoader
+from ORD53.graph.Graph import ColumnarGeometricGraph, GraphException
+
+LINE = """4
+0 0
+1 0
+1 1
+0 0
+
+3
+  5 5
+  6 5
+  1 1
+"""
+
+class TestLineLoader(unittest.TestCase):
+    """Tests for the .line and .poly loaders."""
+
+    def test_line(self):
+        """Chains share vertices, closed chains repeat their first vertex."""
+        g = LineLoader.load(LINE)
+        self.assertIsInstance(g, ColumnarGeometricGraph)
+        self.assertEqual(list(g.vertices), [Vertex2(0.0, 0.0), Vertex2(1.0, 0.0), Vertex2(1.0, 1.0), Vertex2(5.0, 5.0), Vertex2(6.0, 5.0)])
+        self.assertEqual(list(g.edges), [(0, 1), (1, 2), (0, 2), (3, 4), (2, 4)])
+
+    def test_poly(self):
+        """Poly chains are closed implicitly, so the repeated vertex makes a loop."""
+        g = PolyLoader.load(LINE)
+        self.assertEqual(list(g.edges), [(0, 1), (1, 2), (0, 2), (3, 4), (2, 4), (2, 3)])
+
+    def test_errors(self):
+        """Broken files raise the same errors as with the element-wise parser."""
+        self.assertRaises(ValueError, LineLoader.load, "2\n0 0\n1 1 # comment\n")
+        self.assertRaises(ValueError, LineLoader.load, "2\n0 0\n1 0 3\n")
+        self.assertRaises(RuntimeError, LineLoader.load, "1\n0 0\n")
+        self.assertRaises(GraphException, LineLoader.load, "3\n0 0\n1 0\n0 0\n2\n1 0\n0 0\n")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.Obj"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import unittest
+
+from ORD53.common.geometry import Vertex3
+from ORD53.formats.Obj import ObjLoader
+
+class TestObjLoader(unittest.TestCase):
+    """Tests for the OBJ loader."""
+
+    def test_load(self):
+        """Faces are closed, chains are not, and shared edges are only added once."""
+        g = ObjLoader.load(b"# test\nv 0 0 0\nv 1 0 0\nv 1 1 0\nv 0 1 0\nf 1 2 3\nf 1 3 4\nl 1 4\n")
+        self.assertEqual(g.dim, 3)
+        self.assertEqual(len(g.vertices), 4)
+        self.assertEqual(list(g.edges), [(0, 1), (1, 2), (0, 2), (2, 3), (0, 3)])
+
+    def test_references(self):
+        """v/vt/vn triplets and negative indices are resolved, vt and vn lines ignored."""
+        g = ObjLoader.load("v 0 0 0\nvt 0.5 0.5\nvn 0 0 1\nv 1 0 0\nf 1/1/1 2//1 -1/1\nv 2 0 0\nl -1 -3\n")
+        self.assertEqual(list(g.vertices), [Vertex3(0.0, 0.0, 0.0), Vertex3(1.0, 0.0, 0.0), Vertex3(2.0, 0.0, 0.0)])
+        self.assertEqual(list(g.edges), [(0, 1), (0, 2)])
+
+    def test_duplicate_vertices(self):
+        """Repeated coordinates are merged without shifting later indices."""
+        g = ObjLoader.load("v 0 0 0\nv 0 0 0\nv 1 0 0\nl 2 3\n")
+        self.assertEqual(len(g.vertices), 2)
+        self.assertEqual(list(g.edges), [(0, 1)])
+
+    def test_loops(self):
+        """Face sides between merged vertices do not become loops."""
+        g = ObjLoader.load("v 0 0 0\nv 1 0 0\nv 0 0 0\nf 1 2 3\n")
+        self.assertEqual(list(g.edges), [(0, 1)])
+
+    def test_errors(self):
+        """Broken references are rejected."""
+        for text in ("v 0 0 0\nl 1 2\n", "v 0 0 0\nl 0 1\n", "v 0 0 0\nv 1 1 1\nl -3 1\n", "v 0 0\n", "v 0 0 0\nf 1\n"):
+            self.assertRaises(Exception, ObjLoader.load, text)
+
+if __name__ == '__main__':
+    unittest.main()
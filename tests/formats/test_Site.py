@@ -0,0 +1,52 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.Site"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import argparse
+import unittest
+
+import numpy as np
+
+from ORD53.common.geometry import Vertex2
+from ORD53.formats.Site import SiteLoader
+from ORD53.graph.Graph import GraphException
+
+class TestSiteLoader(unittest.TestCase):
+    """Tests for the site loader."""
+
+    def test_segments_and_points(self):
+        """Segments become edges, points isolated vertices, in file order."""
+        g = SiteLoader.load(b"0\n0 0 1 0\n0\n1 0 1 1\n2\n3 3\n\n0\n1 1 0 0\n")
+        self.assertEqual(list(g.vertices), [Vertex2(0.0, 0.0), Vertex2(1.0, 0.0), Vertex2(1.0, 1.0), Vertex2(3.0, 3.0)])
+        self.assertEqual(list(g.edges), [(0, 1), (1, 2), (0, 2)])
+
+    def test_arcs(self):
+        """Arcs are sampled counterclockwise (1) or clockwise (-1) to within the tolerance."""
+        args = argparse.Namespace(arc_tolerance=0.001)
+        g = SiteLoader.load("1\n1 0 -1 0 0 0\n-1\n1 0 -1 0 0 0\n0\n1 0 2 0\n", args=args)
+        c = g.coordinates
+        self.assertEqual(c[0].tolist(), [1, 0])
+        self.assertTrue(np.allclose(np.hypot(c[:-1, 0], c[:-1, 1]), 1))
+        self.assertEqual(len(g.edges), len(c))
+        upper = (c[:, 1] > 0).sum()
+        self.assertEqual(upper, (c[:, 1] < 0).sum())
+        self.assertGreater(upper, 10)
+        coarse = SiteLoader.load("1\n1 0 -1 0 0 0\n", args=argparse.Namespace(arc_tolerance=0.1))
+        self.assertLess(len(coarse.vertices), upper)
+
+    def test_errors(self):
+        """Unknown types and malformed data lines are rejected."""
+        for text in ("3\n0 0\n", "0\n0 0 1\n", "0\n0 0 1 1\n2\n", "x\n1 1\n"):
+            self.assertRaises(Exception, SiteLoader.load, text)
+
+    def test_misaligned(self):
+        """Every data line must hold the values of its own element, not just the right total."""
+        self.assertRaises(GraphException, SiteLoader.load, "0\n0 0 1\n0\n1 1 1 1 1\n")
+
+if __name__ == '__main__':
+    unittest.main()
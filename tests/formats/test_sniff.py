@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.formats.sniff"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import doctest
+import unittest
+
+import ORD53.formats.sniff
+from ORD53.formats.sniff import sniff_extension, SNIFF_SIZE
+
+def load_tests(loader, tests, pattern): # pylint: disable=unused-argument
+    """Add DocTestSuite to unittest tests."""
+    tests.addTests(doctest.DocTestSuite(ORD53.formats.sniff))
+    return tests
+
+class TestSniff(unittest.TestCase):
+    """Additional unittests for sniff module."""
+
+    def test_long_input(self):
+        """Only the beginning is looked at, and a cut off last line does not matter."""
+        line = b"%d\n"%(10000,) + b"0.12345 1.2345\n"*10000
+        self.assertGreater(len(line), SNIFF_SIZE)
+        self.assertEqual(sniff_extension(line), '.line')
+        site = b"0\n0.12345 1.2345 2.3456 3.4567\n"*1000
+        self.assertEqual(sniff_extension(site), '.site')
+        self.assertIsNone(sniff_extension(b"<svg>" + b" "*SNIFF_SIZE))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.graph.Graph"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 2
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import io
+import unittest
+
+import numpy as np
+
+from ORD53.common.geometry import Vertex2, Vertex3, AffineTransform
+from ORD53.graph.Graph import GeometricGraph, ColumnarGeometricGraph, GraphException
+from lxml import etree as ET
+
+def _square(g):
+    """Add a square with one diagonal to g."""
+    pts = [Vertex2(0.0, 0.0), Vertex2(1.0, 0.0), Vertex2(1.0, 1.0), Vertex2(0.0, 1.0)]
+    for i, v in enumerate(pts):
+        g.add_edge_by_vertex(v, pts[(i+1) % len(pts)], w=2.5 if i == 0 else None)
+    g.add_edge_by_index(0, 2, wa='0.5')
+    return g
+
+def _written(g, method, *args):
+    f = io.BytesIO()
+    getattr(g, method)(f, *args)
+    return f.getvalue()
+
+class TestGeometricGraph(unittest.TestCase):
+    """Tests for GeometricGraph."""
+
+    def test_write_graphml(self):
+        """The streaming writer produces the same bytes as serializing the tree."""
+        g = _square(GeometricGraph(source="a--b <&> \u00e4"))
+        g.add_edge_by_vertex(Vertex2('1 & <2>', '\u00e4\r'), Vertex2(0.0, 0.0), w='x>y')
+        for graph in (g, ColumnarGeometricGraph.from_graph(_square(GeometricGraph())), GeometricGraph()):
+            expected = ET.tostring(graph.get_as_graphml(), pretty_print=True)
+            self.assertEqual(_written(graph, 'write_graphml'), expected)
+
+    def test_write_ipe_obj(self):
+        """The chunked ipe and obj writers format every vertex and edge, also across chunks."""
+        g = _square(GeometricGraph())
+        g.WRITE_CHUNK = 3
+        ipe = _written(g, 'write_ipe', True).decode()
+        self.assertEqual(ipe.count('<path layer="edges">\n'), 5)
+        self.assertIn('<path layer="edges">\n    0.0 0.0 m\n    1.0 1.0 l\n  </path>\n<use layer="vertices"', ipe)
+        self.assertEqual(ipe.count('<use layer="vertices"'), 4)
+        self.assertIn('pos="0.0 1.0"', ipe)
+        self.assertEqual(_written(g, 'write_obj'), b"# wavefront obj file\n"
+                         b"v 0.0 0.0 0.0\nv 1.0 0.0 0.0\nv 1.0 1.0 0.0\nv 0.0 1.0 0.0\n"
+                         b"f 1 2\nf 2 3\nf 3 4\nf 1 4\nf 1 3\n")
+        self.assertIn(b"\nf 0 2\n", _written(g, 'write_obj', True))
+        self.assertEqual(_written(GeometricGraph(), 'write_ipe', True).count(b'<path layer'), 0)
+
+    def test_snap(self):
+        """Close vertices are merged on insertion or afterwards, taking their edges along."""
+        g = GeometricGraph(snap=1e-9)
+        self.assertEqual(g.add_vertex(Vertex2(0.1 + 0.2, 1.0)), 0)
+        self.assertEqual(g.add_vertex(Vertex2(0.3, 1.0)), 0)
+        self.assertEqual(g.add_vertex(Vertex2(0.3, 1.0 + 1e-8)), 1)
+        self.assertEqual(g.add_vertex(Vertex2(0.3, 1.0 + 0.5e-9)), 0)
+        self.assertEqual(g.vertices.merged, 2)
+
+        for graph in (GeometricGraph(), ColumnarGeometricGraph()):
+            _square(graph)
+            graph.add_edge_by_vertex(Vertex2(1.0, 1e-12), Vertex2(2.0, 0.0), w='3')
+            graph.add_edge_by_vertex(Vertex2(1.0, 1e-12), Vertex2(0.0, 1.0 - 1e-12))
+            graph.add_edge_by_vertex(Vertex2(1.0, -1e-12), Vertex2(0.0, 0.0))
+            self.assertEqual(graph.snap_vertices(1e-9), 3)
+            self.assertEqual(list(graph.vertices), [Vertex2(0.0, 0.0), Vertex2(1.0, 0.0), Vertex2(1.0, 1.0), Vertex2(0.0, 1.0), Vertex2(2.0, 0.0)])
+            self.assertEqual([(e, None if a['w'] is None else float(a['w']), a['wa']) for e, a in graph.edges.items()], [
+                ((0, 1), 2.5, None), ((1, 2), None, None), ((2, 3), None, None), ((0, 3), None, None),
+                ((0, 2), None, '0.5'), ((1, 4), 3.0, None), ((1, 3), None, None)])
+
+    def test_transform_snapping(self):
+        """Transforming a graph built with snap merges vertices the transformation brings close."""
+        g = GeometricGraph(snap=0.1)
+        g.add_edge_by_vertex(Vertex2(0.0, 0.0), Vertex2(1.0, 0.0))
+        g.add_edge_by_vertex(Vertex2(1.0, 0.0), Vertex2(2.0, 0.0))
+        g.add_edge_by_vertex(Vertex2(2.0, 0.0), Vertex2(20.0, 0.0))
+        self.assertEqual(g.transform_coordinates(scale=0.01, on_collision='merge'), 2)
+        self.assertEqual(list(g.vertices), [Vertex2(0.0, 0.0), Vertex2(0.2, 0.0)])
+        self.assertEqual(list(g.edges), [(0, 1)])
+        self.assertEqual(g.add_vertex(Vertex2(0.25, 0.0)), 1)
+
+    def test_randomize_weights(self):
+        """Random weights are reproducible, in range, and the same for both kinds of graph."""
+        for round_n in (None, 0, 1):
+            outputs = []
+            for g in (_square(GeometricGraph()), _square(ColumnarGeometricGraph())):
+                g.randomize_weights(1.0, 3.0, round_n=round_n, rng=42)
+                weights = [a['w'] for _, a in g.edges.items()]
+                self.assertTrue(all(1.0 <= float(w) <= 3.0 for w in weights))
+                if round_n == 0:
+                    self.assertTrue(all(w in ('1', '2', '3') for w in weights))
+                self.assertEqual([a['wa'] for _, a in g.edges.items()][-1], '0.5')
+                outputs.append(_written(g, 'write_graphml'))
+            self.assertEqual(outputs[0], outputs[1])
+
+    def test_transform(self):
+        """Transformations either fail on colliding vertices or merge them, for both kinds of graph."""
+        for cls in (GeometricGraph, ColumnarGeometricGraph):
+            g = _square(cls())
+            g.transform_coordinates(scale=2, transform=AffineTransform().translated(1, 0))
+            self.assertEqual(list(g.vertices), [Vertex2(1.0, 0.0), Vertex2(3.0, 0.0), Vertex2(3.0, 2.0), Vertex2(1.0, 2.0)])
+
+            squash = AffineTransform().transformed(1, 0, 0, 0, 0, 0)
+            self.assertRaises(GraphException, g.transform_coordinates, transform=squash)
+            self.assertEqual(len(g.vertices), 4)
+            self.assertEqual(g.transform_coordinates(transform=squash, on_collision='merge'), 2)
+            self.assertEqual(list(g.vertices), [Vertex2(1.0, 0.0), Vertex2(3.0, 0.0)])
+            self.assertEqual(list(g.edges), [(0, 1)])
+
+class TestColumnarGeometricGraph(unittest.TestCase):
+    """Tests for the array backed graph."""
+
+    def test_same_as_geometric_graph(self):
+        """Element-wise use gives the same graph and output as GeometricGraph."""
+        g = _square(GeometricGraph())
+        c = _square(ColumnarGeometricGraph())
+
+        self.assertEqual(list(g.vertices), list(c.vertices))
+        self.assertEqual([e for e, _ in g.edges.items()], [e for e, _ in c.edges.items()])
+        for method, args in (('write_graphml', ()), ('write_ipe', (True,)), ('write_obj', ())):
+            self.assertEqual(_written(g, method, *args), _written(c, method, *args))
+
+    def test_duplicates_and_loops(self):
+        """Duplicate edges raise, loops are ignored, vertices are shared."""
+        c = _square(ColumnarGeometricGraph())
+        self.assertRaises(GraphException, c.add_edge_by_index, 2, 0)
+        self.assertRaises(GraphException, c.add_edge_by_vertex, Vertex2(1.0, 1.0), Vertex2(1.0, 0.0))
+        c.add_edge_by_vertex(Vertex2(-0.0, 0.0), Vertex2(0.0, 0.0))
+        self.assertEqual(len(c.vertices), 4)
+        self.assertEqual(len(c.edges), 5)
+
+    def test_bulk(self):
+        """add_vertices and add_edges_by_index agree with the element-wise calls."""
+        c = ColumnarGeometricGraph()
+        idx = c.add_vertices([(0, 0), (1, 0), (0, 0), (1, 1)])
+        self.assertEqual(idx.tolist(), [0, 1, 0, 2])
+        self.assertEqual(c.add_vertex(Vertex2(1.0, 1.0)), 2)
+        self.assertEqual(c.add_vertices([(2, 2), (1, 0)]).tolist(), [3, 1])
+
+        c.add_edges_by_index([(1, 0), (1, 2), (3, 2)], w=[1.5, np.nan, 2.0])
+        self.assertEqual(c.edges[(0, 1)], {'w': '1.5', 'wa': None})
+        self.assertEqual(c.edges[(2, 3)], {'w': '2.0', 'wa': None})
+        self.assertRaises(GraphException, c.add_edges_by_index, [(0, 3), (3, 0)])
+        self.assertRaises(GraphException, c.add_edge_by_index, 1, 0)
+        self.assertRaises(GraphException, c.add_edges_by_index, [(0, 4)])
+
+        c.add_edges_by_index([(0, 1), (0, 3), (3, 3)], wa=0.5, ignore_dups=True, ignore_loops=True)
+        self.assertEqual(list(c.edges), [(0, 1), (1, 2), (2, 3), (0, 3)])
+        self.assertEqual(c.edges[(0, 1)], {'w': None, 'wa': '0.5'})
+
+    def test_from_arrays(self):
+        """Graphs can take over read-only arrays and still be modified."""
+        coords = np.array([(0.0, 0.0, 0.0), (1.0, 0.0, 2.0)])
+        coords.flags.writeable = False
+        edges = np.array([(1, 0)])
+        c = ColumnarGeometricGraph.from_arrays(coords, edges)
+        self.assertEqual(list(c.vertices), [Vertex3(0.0, 0.0, 0.0), Vertex3(1.0, 0.0, 2.0)])
+        self.assertEqual(list(c.edges), [(0, 1)])
+        c.transform_coordinates(scale=2)
+        self.assertEqual(c.vertices[1], Vertex3(2.0, 0.0, 4.0))
+        self.assertEqual(coords[1].tolist(), [1.0, 0.0, 2.0])
+
+        g = _square(GeometricGraph())
+        self.assertEqual(_written(ColumnarGeometricGraph.from_graph(g), 'write_graphml'), _written(g, 'write_graphml'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+
+"""Tests for ORD53.convert"""
+
+if __name__ == '__main__' and __package__ is None:
+    import os
+    __LEVEL = 1
+    os.sys.path.append(os.path.abspath(os.path.join(*([os.path.dirname(__file__)] + ['..']*__LEVEL))))
+
+import concurrent.futures
+import doctest
+import io
+import os
+import tempfile
+import unittest
+
+from ORD53.common.geometry import Vertex2
+import ORD53.convert
+from ORD53.convert import ConversionError, convert, load, options
+
+LINE = b"3\n0 0\n1 0\n1 1\n2\n5 5\n6 5\n"
+
+IPE = b"""<?xml version="1.0"?>
+<ipe version="70206">
+<page>
+<layer name="alpha"/>
+<layer name="beta"/>
+<view layers="alpha" active="alpha"/>
+<view layers="alpha beta" active="beta"/>
+<path layer="alpha">
+0 0 m
+1 0 l
+</path>
+<path layer="beta">
+2 2 m
+3 3 l
+</path>
+</page>
+</ipe>
+"""
+
+def load_tests(loader, tests, pattern): # pylint: disable=unused-argument
+    """Add DocTestSuite to unittest tests."""
+    tests.addTests(doctest.DocTestSuite(ORD53.convert))
+    return tests
+
+class TestConvert(unittest.TestCase):
+    """Tests for the in-process conversion API."""
+
+    def test_options(self):
+        """Options default like the command line, except for jobs; unknown ones are refused."""
+        args = options(ipe=True, transforms=[('scaled', [2.0])])
+        self.assertTrue(args.ipe)
+        self.assertFalse(args.obj)
+        self.assertEqual(args.jobs, 1)
+        self.assertEqual(args.on_collision, 'error')
+        self.assertRaises(TypeError, options, no_such_option=1)
+
+    def test_sources_and_outputs(self):
+        """Paths, bytes and file objects convert alike, to bytes, files named after a path, or a file object."""
+        expected = convert(LINE, args=options(obj=True))
+        self.assertEqual(len(expected), 1)
+        self.assertTrue(expected[0].endswith(b"f 1 2\nf 2 3\nf 4 5\n"))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "in.line")
+            with open(path, 'wb') as f:
+                f.write(LINE)
+            self.assertEqual(convert(path, args=options(obj=True)), expected)
+            with open(path, 'rb') as f:
+                self.assertEqual(convert(f, args=options(obj=True)), expected)
+
+            names = convert(IPE, os.path.join(tmp, "out.obj"), name="x.ipe", args=options(obj=True))
+            self.assertEqual([os.path.basename(n) for n in names], ["out-000.obj", "out-001.obj"])
+            with open(names[1], 'rb') as f:
+                self.assertIn(b"v 3.0 3.0 0.0\n", f.read())
+
+            f = io.BytesIO()
+            self.assertIsNone(convert(IPE, f, args=options(obj=True)))
+            self.assertEqual(f.getvalue().count(b"# wavefront obj file\n"), 2)
+
+            cache = os.path.join(tmp, "cache")
+            for _ in range(2):
+                self.assertEqual(convert(LINE, args=options(obj=True, cache=cache)), expected)
+
+    def test_load(self):
+        """load() returns the processed graphs; inputs no loader understands, or --graph for non-GraphML input, raise."""
+        g, = load(LINE, args=options(transforms=[('scaled', [2.0])]))
+        self.assertEqual(list(g.vertices)[:2], [Vertex2(0.0, 0.0), Vertex2(2.0, 0.0)])
+        self.assertRaises(ConversionError, load, b"no graph here\n")
+        self.assertRaises(ConversionError, convert, b"no graph here\n")
+        self.assertRaises(ConversionError, load, LINE, args=options(graph=0))
+        self.assertRaises(ConversionError, load, IPE, name="x.ipe", args=options(graph=0))
+
+    def test_guessed_format(self):
+        """A format guessed from count-prefixed contents is tried first, but others may still work."""
+        pnt = b"5\n1 2\n3 4\n1 2\n5 6\n7 8\n"
+        g, = load(pnt)
+        self.assertEqual(g.fmt, "Point.py")
+        self.assertEqual(len(g.vertices), 4)
+        self.assertRaises(Exception, load, pnt, name="points.line")
+        self.assertRaises(Exception, load, pnt, args=options(format='line'))
+
+    def test_threads(self):
+        """Conversions in several threads at once give the same results as one after another."""
+        inputs = [(LINE, options(ipe=True, ipe_markers=True)), (IPE, options()), (LINE, options(randomize_weights=True, seed=3))] * 4
+        expected = [convert(source, args=args) for source, args in inputs]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda i: convert(i[0], args=i[1]), inputs))
+        self.assertEqual(results, expected)
+
+if __name__ == '__main__':
+    unittest.main()